@@ -4,6 +4,7 @@ Provides REST API for triggering hazard analyses
 """
 
 from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional, Dict
 from pathlib import Path
@@ -13,6 +14,9 @@ from processing.landslide.pipeline import run_landslide_pipeline
 from processing.flood.pipeline import run_flood_pipeline
 from processing.exposure.pipeline import run_exposure_pipeline
 from processing.multi_hazard import run_multi_hazard_integration
+from workers import (
+    task_queue_available, submit_job, get_job, serialize_outputs, run_in_compute_pool
+)
 
 logger = logging.getLogger(__name__)
 
@@ -52,11 +56,43 @@ class HazardResponse(BaseModel):
     outputs: Optional[Dict[str, str]] = None
 
 
-@router.post("/landslide", response_model=HazardResponse)
-async def process_landslide(request: LandslideRequest):
+class JobResponse(BaseModel):
+    """Response model for a queued hazard job"""
+    job_id: str
+    status: str
+    status_url: str
+
+
+class JobStatusResponse(BaseModel):
+    """Response model for hazard job state"""
+    job_id: str
+    status: str
+    pipeline: Optional[str] = None
+    outputs: Optional[Dict[str, str]] = None
+    error: Optional[str] = None
+
+
+def queue_job(pipeline: str, kwargs: Dict) -> JSONResponse:
+    """Queue a pipeline on the workers and return 202 with the job location"""
+    job_id = submit_job(pipeline, kwargs)
+    
+    job = JobResponse(
+        job_id=job_id,
+        status="queued",
+        status_url=f"{router.prefix}/jobs/{job_id}"
+    )
+    
+    return JSONResponse(status_code=202, content=job.model_dump())
+
+
+@router.post("/landslide", response_model=HazardResponse, responses={202: {"model": JobResponse}})
+async def process_landslide(request: LandslideRequest, sync: bool = False):
     """
     Trigger landslide susceptibility analysis
     
+    Queues the pipeline on a worker and returns 202 with a job ID when the
+    task queue answered at startup; otherwise, or with sync=true, runs it inline.
+    
     Returns paths to generated outputs (GeoTIFF + GeoJSON)
     """
     try:
@@ -76,11 +112,14 @@ async def process_landslide(request: LandslideRequest):
         if request.output_dir:
             kwargs["output_dir"] = Path(request.output_dir)
         
-        # Run pipeline
-        outputs = run_landslide_pipeline(**kwargs)
+        if task_queue_available() and not sync:
+            return queue_job("landslide", kwargs)
+        
+        # Run pipeline in the compute pool so API workers keep serving requests
+        outputs = await run_in_compute_pool(run_landslide_pipeline, **kwargs)
         
         # Convert Path objects to strings
-        outputs_str = {k: str(v) for k, v in outputs.items()}
+        outputs_str = serialize_outputs(outputs)
         
         return HazardResponse(
             status="success",
@@ -93,11 +132,14 @@ async def process_landslide(request: LandslideRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/flood", response_model=HazardResponse)
-async def process_flood(request: FloodRequest):
+@router.post("/flood", response_model=HazardResponse, responses={202: {"model": JobResponse}})
+async def process_flood(request: FloodRequest, sync: bool = False):
     """
     Trigger flood mapping from SAR data
     
+    Queues the pipeline on a worker when the task queue answered at startup;
+    otherwise, or with sync=true, runs it inline.
+    
     Returns paths to generated outputs (GeoTIFF + GeoJSON)
     """
     try:
@@ -112,16 +154,14 @@ async def process_flood(request: FloodRequest):
         if request.output_dir:
             kwargs["output_dir"] = Path(request.output_dir)
         
-        # Run pipeline
-        outputs = run_flood_pipeline(**kwargs)
+        if task_queue_available() and not sync:
+            return queue_job("flood", kwargs)
         
-        # Format statistics
-        if 'statistics' in outputs:
-            stats = outputs.pop('statistics')
-            outputs['statistics'] = str(stats)
+        # Run pipeline in the compute pool so API workers keep serving requests
+        outputs = await run_in_compute_pool(run_flood_pipeline, **kwargs)
         
-        # Convert Path objects to strings
-        outputs_str = {k: str(v) for k, v in outputs.items()}
+        # Convert Path objects and statistics to strings
+        outputs_str = serialize_outputs(outputs)
         
         return HazardResponse(
             status="success",
@@ -134,12 +174,14 @@ async def process_flood(request: FloodRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/exposure", response_model=HazardResponse)
-async def process_exposure(request: ExposureRequest):
+@router.post("/exposure", response_model=HazardResponse, responses={202: {"model": JobResponse}})
+async def process_exposure(request: ExposureRequest, sync: bool = False):
     """
     Trigger exposure analysis
     
-    Requires a hazard raster (landslide or flood) as input
+    Requires a hazard raster (landslide or flood) as input.
+    Queues the pipeline on a worker when the task queue answered at startup;
+    otherwise, or with sync=true, runs it inline.
     """
     try:
         logger.info("Processing exposure analysis request")
@@ -157,11 +199,14 @@ async def process_exposure(request: ExposureRequest):
         if request.output_dir:
             kwargs["output_dir"] = Path(request.output_dir)
         
-        # Run pipeline
-        outputs = run_exposure_pipeline(**kwargs)
+        if task_queue_available() and not sync:
+            return queue_job("exposure", kwargs)
+        
+        # Run pipeline in the compute pool so API workers keep serving requests
+        outputs = await run_in_compute_pool(run_exposure_pipeline, **kwargs)
         
         # Convert Path objects to strings
-        outputs_str = {k: str(v) for k, v in outputs.items()}
+        outputs_str = serialize_outputs(outputs)
         
         return HazardResponse(
             status="success",
@@ -176,21 +221,26 @@ async def process_exposure(request: ExposureRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/multi_risk", response_model=HazardResponse)
-async def process_multi_hazard():
+@router.post("/multi_risk", response_model=HazardResponse, responses={202: {"model": JobResponse}})
+async def process_multi_hazard(sync: bool = False):
     """
     Generate composite multi-hazard risk map
     
-    Combines landslide, flood, and exposure outputs
+    Combines landslide, flood, and exposure outputs.
+    Queues the integration on a worker when the task queue answered at startup;
+    otherwise, or with sync=true, runs it inline.
     """
     try:
         logger.info("Processing multi-hazard integration request")
         
+        if task_queue_available() and not sync:
+            return queue_job("multi_hazard", {})
+        
         # Run integration
-        outputs = run_multi_hazard_integration()
+        outputs = await run_in_compute_pool(run_multi_hazard_integration)
         
         # Convert Path objects to strings
-        outputs_str = {k: str(v) for k, v in outputs.items()}
+        outputs_str = serialize_outputs(outputs)
         
         return HazardResponse(
             status="success",
@@ -203,6 +253,29 @@ async def process_multi_hazard():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(job_id: str):
+    """
+    Poll the state of a queued hazard job
+    
+    Args:
+        job_id: Job ID returned when the job was queued
+    
+    Returns:
+        Job status (queued, running, success, failed) with outputs or error
+    """
+    try:
+        job = get_job(job_id)
+    except Exception as e:
+        logger.error(f"Error reading job {job_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    
+    return JobStatusResponse(job_id=job_id, **job)
+
+
 @router.get("/status")
 async def get_status():
     """Check API status"""
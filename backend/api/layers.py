@@ -3,10 +3,14 @@ Layer management API endpoints
 Provides access to processed layers (list, retrieve GeoJSON)
 """
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from typing import List
 from pathlib import Path
+from functools import lru_cache
+from email.utils import formatdate
+import hashlib
 import json
 import logging
 
@@ -14,49 +18,124 @@ from config import OUTPUTS_DIR
 
 logger = logging.getLogger(__name__)
 
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+    logger.debug("ijson not available, falling back to json.load for feature counts")
+
 router = APIRouter(prefix="/api/layers", tags=["layers"])
 
+# Feature counts per path, tagged with (mtime_ns, size) so unchanged files are never re-parsed
+_feature_count_cache = {}
+
+
+def count_features(geojson_path: Path) -> int:
+    """
+    Count features in a GeoJSON FeatureCollection without materializing it
+    
+    Args:
+        geojson_path: Path to GeoJSON file
+    
+    Returns:
+        Number of features
+    """
+    stat = geojson_path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+    
+    cached = _feature_count_cache.get(str(geojson_path))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
+    if IJSON_AVAILABLE:
+        # Stream tokens; only one feature is ever held in memory
+        with open(geojson_path, 'rb') as f:
+            count = sum(1 for _ in ijson.items(f, 'features.item'))
+    else:
+        with open(geojson_path, 'r') as f:
+            count = len(json.load(f).get('features', []))
+    
+    _feature_count_cache[str(geojson_path)] = (signature, count)
+    return count
+
+
+def layers_signature() -> tuple:
+    """
+    Build a hashable signature of the outputs directory
+    
+    Returns:
+        Tuple of (name, mtime_ns, size, has_raster) for every GeoJSON layer
+    """
+    if not OUTPUTS_DIR.exists():
+        return ()
+    
+    entries = []
+    for geojson_file in sorted(OUTPUTS_DIR.glob("*.geojson")):
+        stat = geojson_file.stat()
+        has_raster = geojson_file.with_suffix('.tif').exists()
+        entries.append((geojson_file.name, stat.st_mtime_ns, stat.st_size, has_raster))
+    
+    return tuple(entries)
+
+
+@lru_cache(maxsize=1)
+def _scan_layers(signature: tuple) -> dict:
+    """Build the layer listing for a given outputs directory signature"""
+    layers = []
+    
+    for name, _, _, has_raster in signature:
+        geojson_file = OUTPUTS_DIR / name
+        raster_file = geojson_file.with_suffix('.tif')
+        
+        layer_info = {
+            "name": geojson_file.stem,
+            "geojson": str(geojson_file),
+            "raster": str(raster_file) if has_raster else None,
+            "type": "vector",
+        }
+        
+        # Try to get feature count
+        try:
+            layer_info["feature_count"] = count_features(geojson_file)
+        except:
+            pass
+        
+        layers.append(layer_info)
+    
+    logger.info(f"Found {len(layers)} layers")
+    
+    return {
+        "count": len(layers),
+        "layers": layers
+    }
+
 
 @router.get("/list")
-async def list_layers():
+async def list_layers(request: Request):
     """
     List all available processed layers
     
+    The listing is rebuilt only when a GeoJSON in the outputs directory
+    changes; clients sending a matching If-None-Match receive 304.
+    
     Returns:
         List of available layers with metadata
     """
     try:
-        layers = []
+        signature = await run_in_threadpool(layers_signature)
         
-        # Scan outputs directory for GeoJSON files
-        if OUTPUTS_DIR.exists():
-            for geojson_file in OUTPUTS_DIR.glob("*.geojson"):
-                # Get corresponding raster if exists
-                raster_file = geojson_file.with_suffix('.tif')
-                
-                layer_info = {
-                    "name": geojson_file.stem,
-                    "geojson": str(geojson_file),
-                    "raster": str(raster_file) if raster_file.exists() else None,
-                    "type": "vector",
-                }
-                
-                # Try to get feature count
-                try:
-                    with open(geojson_file, 'r') as f:
-                        data = json.load(f)
-                        layer_info["feature_count"] = len(data.get('features', []))
-                except:
-                    pass
-                
-                layers.append(layer_info)
+        etag = '"' + hashlib.md5(repr(signature).encode()).hexdigest() + '"'
+        headers = {"ETag": etag}
+        if signature:
+            last_modified = max(entry[1] for entry in signature) / 1e9
+            headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
         
-        logger.info(f"Found {len(layers)} layers")
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
         
-        return {
-            "count": len(layers),
-            "layers": layers
-        }
+        layers = await run_in_threadpool(_scan_layers, signature)
+        return JSONResponse(content=layers, headers=headers)
     
     except Exception as e:
         logger.error(f"Error listing layers: {e}", exc_info=True)
@@ -84,13 +163,11 @@ async def get_layer(layer_name: str):
                 detail=f"Layer '{layer_name}' not found"
             )
         
-        # Read and return GeoJSON
-        with open(geojson_path, 'r') as f:
-            geojson = json.load(f)
-        
         logger.info(f"Serving layer: {layer_name}")
         
-        return geojson
+        # Serve the file bytes as-is (no parse/re-serialize); sent via sendfile
+        # with ETag/Last-Modified so unchanged layers can be revalidated
+        return FileResponse(path=str(geojson_path), media_type="application/geo+json")
     
     except HTTPException:
         raise
@@ -106,7 +183,7 @@ async def download_layer(layer_name: str, format: str = "geojson"):
     
     Args:
         layer_name: Name of the layer
-        format: File format ('geojson' or 'tif')
+        format: File format ('geojson', 'fgb', 'pbf' or 'tif')
     
     Returns:
         File download
@@ -115,6 +192,12 @@ async def download_layer(layer_name: str, format: str = "geojson"):
         if format == "geojson":
             file_path = OUTPUTS_DIR / f"{layer_name}.geojson"
             media_type = "application/geo+json"
+        elif format == "fgb":
+            file_path = OUTPUTS_DIR / f"{layer_name}.fgb"
+            media_type = "application/flatgeobuf"
+        elif format == "pbf":
+            file_path = OUTPUTS_DIR / f"{layer_name}.pbf"
+            media_type = "application/x-protobuf"
         elif format == "tif":
             file_path = OUTPUTS_DIR / f"{layer_name}.tif"
             media_type = "image/tiff"
@@ -5,21 +5,199 @@ Serves raster visualizations as PNG with colormaps
 
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Iterator
 import rasterio
 import numpy as np
-from io import BytesIO
 from PIL import Image
+import threading
+import queue
 import logging
 
 from config import OUTPUTS_DIR, COLORMAPS
-from processing.utils.raster_utils import apply_colormap
+from processing.utils.raster_utils import apply_colormap, build_colormap_lut
 
 logger = logging.getLogger(__name__)
 
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):
+    PYVIPS_AVAILABLE = False
+    logger.debug("pyvips not available, using Pillow for PNG encoding")
+
 router = APIRouter(prefix="/api/preview", tags=["preview"])
 
 
+# Size of each chunk handed to the client while a PNG is being encoded
+PNG_CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkWriter:
+    """File-like sink that forwards fixed-size chunks to a callback"""
+    
+    def __init__(self, emit, chunk_size: int = PNG_CHUNK_SIZE):
+        self.emit = emit
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+    
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.chunk_size:
+            self.emit(bytes(self.buffer[:self.chunk_size]))
+            del self.buffer[:self.chunk_size]
+        return len(data)
+    
+    def flush(self) -> None:
+        if self.buffer:
+            self.emit(bytes(self.buffer))
+            self.buffer.clear()
+
+
+class _StreamClosed(Exception):
+    """Raised inside the encoder when the client stops reading"""
+
+
+def write_png(rgb: np.ndarray, fileobj, max_size: Optional[int] = None) -> None:
+    """
+    Encode an RGB array as PNG into a writable file-like object
+    
+    Uses libvips when available (SIMD zlib, releases the GIL), else Pillow.
+    
+    Args:
+        rgb: RGB array (height, width, 3) of uint8
+        fileobj: Object with a write(bytes) method
+        max_size: Maximum dimension of the output image
+    """
+    rgb = np.ascontiguousarray(rgb, dtype=np.uint8)
+    height, width = rgb.shape[:2]
+    
+    if PYVIPS_AVAILABLE:
+        img = pyvips.Image.new_from_memory(rgb.data, width, height, 3, 'uchar')
+        if max_size is not None:
+            img = img.thumbnail_image(max_size, height=max_size, size='down')
+        
+        def on_write(chunk) -> int:
+            try:
+                return fileobj.write(chunk)
+            except Exception:
+                # libvips cannot propagate Python exceptions; report a write error instead
+                return -1
+        
+        target = pyvips.TargetCustom()
+        target.on_write(on_write)
+        img.pngsave_target(target, compression=3, effort=1)
+        return
+    
+    img = Image.fromarray(rgb, mode='RGB')
+    if max_size is not None:
+        img.thumbnail((max_size, max_size))
+    
+    img.save(fileobj, format='PNG')
+
+
+def iter_png(rgb: np.ndarray, max_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Stream an RGB array as PNG chunks while it is being encoded
+    
+    Encoding runs in a background thread feeding a small bounded queue, so
+    the first bytes go out immediately and at most a few chunks are buffered.
+    
+    Args:
+        rgb: RGB array (height, width, 3) of uint8
+        max_size: Maximum dimension of the output image
+    
+    Yields:
+        PNG-encoded byte chunks
+    """
+    chunks = queue.Queue(maxsize=4)
+    closed = threading.Event()
+    
+    def emit(chunk) -> None:
+        # Block while the client is behind, but give up once it has gone away
+        while not closed.is_set():
+            try:
+                chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+        raise _StreamClosed()
+    
+    def encode() -> None:
+        try:
+            writer = _ChunkWriter(emit)
+            write_png(rgb, writer, max_size)
+            writer.flush()
+            emit(None)
+        except Exception as e:
+            if closed.is_set():
+                # Client went away; nothing left to report
+                return
+            logger.error(f"Error encoding PNG: {e}", exc_info=True)
+            try:
+                emit(e)
+            except _StreamClosed:
+                pass
+    
+    threading.Thread(target=encode, daemon=True).start()
+    
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        closed.set()
+
+
+# Pixel value -> class name for each colormap kind
+CLASS_MAPPINGS = {
+    'landslide': {1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"},
+    'flood': {0: "no_flood", 1: "flood"},
+    'exposure': {1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"},
+    'multi_hazard': {1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"},
+}
+
+# 256-entry RGB palettes, built once at import, for uint8 classified rasters
+COLORMAP_LUTS = {
+    kind: build_colormap_lut(COLORMAPS[kind], CLASS_MAPPINGS[kind])
+    for kind in COLORMAPS
+}
+
+
+@lru_cache(maxsize=128)
+def get_layer_kind(layer_name: str) -> str:
+    """
+    Determine colormap kind from layer name
+    
+    Args:
+        layer_name: Name of the layer
+    
+    Returns:
+        Key into COLORMAPS / CLASS_MAPPINGS
+    """
+    name = layer_name.lower()
+    
+    if "landslide" in name:
+        return 'landslide'
+    elif "flood" in name:
+        return 'flood'
+    elif "exposure" in name:
+        return 'exposure'
+    elif "multi_hazard" in name or "risk" in name:
+        return 'multi_hazard'
+    
+    # Default colormap
+    return 'multi_hazard'
+
+
+@lru_cache(maxsize=128)
 def get_colormap_for_layer(layer_name: str) -> tuple:
     """
     Get appropriate colormap and class mapping for layer
@@ -28,27 +206,89 @@ def get_colormap_for_layer(layer_name: str) -> tuple:
         layer_name: Name of the layer
     
     Returns:
-        Tuple of (colormap_dict, class_mapping_dict)
-    """
-    # Determine layer type from name
-    if "landslide" in layer_name.lower():
-        colormap = COLORMAPS['landslide']
-        class_mapping = {1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"}
-    elif "flood" in layer_name.lower():
-        colormap = COLORMAPS['flood']
-        class_mapping = {0: "no_flood", 1: "flood"}
-    elif "exposure" in layer_name.lower():
-        colormap = COLORMAPS['exposure']
-        class_mapping = {1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"}
-    elif "multi_hazard" in layer_name.lower() or "risk" in layer_name.lower():
-        colormap = COLORMAPS['multi_hazard']
-        class_mapping = {1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"}
-    else:
-        # Default colormap
-        colormap = COLORMAPS['multi_hazard']
-        class_mapping = {1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"}
-    
-    return colormap, class_mapping
+        Tuple of read-only (colormap, class_mapping) views, shared between calls
+    """
+    kind = get_layer_kind(layer_name)
+    return MappingProxyType(COLORMAPS[kind]), MappingProxyType(CLASS_MAPPINGS[kind])
+
+
+def colorize(array: np.ndarray, layer_name: str) -> np.ndarray:
+    """
+    Convert raster values to RGB using the layer's colormap
+    
+    Args:
+        array: Raster values
+        layer_name: Name of the layer
+    
+    Returns:
+        RGB array (height, width, 3)
+    """
+    if array.dtype == np.uint8:
+        # Single vectorized gather through the precomputed palette
+        return COLORMAP_LUTS[get_layer_kind(layer_name)][array]
+    
+    colormap, class_mapping = get_colormap_for_layer(layer_name)
+    return apply_colormap(array, colormap, class_mapping)
+
+
+def render_preview(raster_path: Path, layer_name: str) -> Iterator[bytes]:
+    """
+    Read a raster and render it as a colorized PNG
+    
+    Args:
+        raster_path: Path to raster file
+        layer_name: Name of the layer (selects colormap)
+    
+    Returns:
+        Iterator of PNG chunks (encoded lazily as the response is sent)
+    """
+    # Read raster
+    with rasterio.open(raster_path) as src:
+        array = src.read(1)
+    
+    # Apply colormap
+    rgb = colorize(array, layer_name)
+    
+    # Encode PNG
+    return iter_png(rgb)
+
+
+def render_thumbnail(raster_path: Path, layer_name: str, max_size: int) -> Iterator[bytes]:
+    """
+    Read a decimated raster and render it as a colorized PNG thumbnail
+    
+    Args:
+        raster_path: Path to raster file
+        layer_name: Name of the layer (selects colormap)
+        max_size: Maximum dimension for thumbnail
+    
+    Returns:
+        Iterator of PNG chunks (encoded lazily as the response is sent)
+    """
+    # Read with downsampling for thumbnail (never writes to the served raster)
+    with rasterio.open(raster_path) as src:
+        # Coarsest overview level that still covers max_size
+        factor = 1
+        for overview in src.overviews(1):
+            if max(src.width, src.height) // overview >= max_size:
+                factor = max(factor, overview)
+        
+        # No suitable overview: plain decimated read
+        if factor == 1:
+            factor = max(src.width // max_size, src.height // max_size, 1)
+        
+        # Read downsampled (GDAL serves this from the matching overview)
+        array = src.read(
+            1,
+            out_shape=(src.height // factor, src.width // factor),
+            resampling=rasterio.enums.Resampling.nearest
+        )
+    
+    # Apply colormap
+    rgb = colorize(array, layer_name)
+    
+    # Create thumbnail
+    return iter_png(rgb, max_size=max_size)
 
 
 @router.get("/raster/{layer_name}")
@@ -82,27 +322,12 @@ async def preview_raster(layer_name: str):
                 detail=f"Raster '{layer_name}' not found"
             )
         
-        # Read raster
-        with rasterio.open(raster_path) as src:
-            array = src.read(1)
-        
-        # Get colormap
-        colormap, class_mapping = get_colormap_for_layer(layer_name)
-        
-        # Apply colormap
-        rgb = apply_colormap(array, colormap, class_mapping)
-        
-        # Convert to PIL Image
-        img = Image.fromarray(rgb, mode='RGB')
-        
-        # Save to BytesIO
-        buf = BytesIO()
-        img.save(buf, format='PNG')
-        buf.seek(0)
+        # Read and colorize off the event loop; PNG chunks are encoded as they are sent
+        png_chunks = await run_in_threadpool(render_preview, raster_path, layer_name)
         
         logger.info(f"Serving raster preview: {layer_name}")
         
-        return StreamingResponse(buf, media_type="image/png")
+        return StreamingResponse(png_chunks, media_type="image/png")
     
     except HTTPException:
         raise
@@ -139,32 +364,10 @@ async def get_thumbnail(layer_name: str, max_size: int = 256):
         if raster_path is None:
             raise HTTPException(status_code=404, detail=f"Raster '{layer_name}' not found")
         
-        # Read with downsampling for thumbnail
-        with rasterio.open(raster_path) as src:
-            # Calculate overview factor
-            factor = max(src.width // max_size, src.height // max_size, 1)
-            
-            # Read downsampled
-            array = src.read(
-                1,
-                out_shape=(src.height // factor, src.width // factor),
-                resampling=rasterio.enums.Resampling.nearest
-            )
-        
-        # Get colormap and apply
-        colormap, class_mapping = get_colormap_for_layer(layer_name)
-        rgb = apply_colormap(array, colormap, class_mapping)
-        
-        # Create thumbnail
-        img = Image.fromarray(rgb, mode='RGB')
-        img.thumbnail((max_size, max_size))
-        
-        # Save to buffer
-        buf = BytesIO()
-        img.save(buf, format='PNG')
-        buf.seek(0)
+        # Read and colorize off the event loop; PNG chunks are encoded as they are sent
+        png_chunks = await run_in_threadpool(render_thumbnail, raster_path, layer_name, max_size)
         
-        return StreamingResponse(buf, media_type="image/png")
+        return StreamingResponse(png_chunks, media_type="image/png")
     
     except HTTPException:
         raise
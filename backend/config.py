@@ -4,8 +4,19 @@ Contains all system parameters, paths, and settings
 """
 
 import os
+import logging
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
+# Read and write vector data through pyogrio (bulk, Arrow/NumPy-backed) when available
+try:
+    import pyogrio
+    import geopandas
+    geopandas.options.io_engine = "pyogrio"
+except ImportError:
+    logger.info("pyogrio not available, geopandas will use Fiona for vector I/O")
+
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -13,9 +24,10 @@ RAW_DATA_DIR = DATA_DIR / "raw"
 PROCESSED_DATA_DIR = DATA_DIR / "processed"
 OUTPUTS_DIR = DATA_DIR / "outputs"
 MODELS_DIR = BASE_DIR / "backend" / "models"
+CACHE_DIR = PROCESSED_DATA_DIR / "cache"
 
 # Ensure directories exist
-for dir_path in [RAW_DATA_DIR, PROCESSED_DATA_DIR, OUTPUTS_DIR, MODELS_DIR]:
+for dir_path in [RAW_DATA_DIR, PROCESSED_DATA_DIR, OUTPUTS_DIR, MODELS_DIR, CACHE_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
 # Input data files (expected in data/raw/)
@@ -24,7 +36,11 @@ INPUT_FILES = {
     "landcover": RAW_DATA_DIR / "landcover.tif",
     "rainfall": RAW_DATA_DIR / "rainfall.tif",
     "sentinel1_sar": RAW_DATA_DIR / "sentinel1_sar.tif",
-    "buildings": RAW_DATA_DIR / "buildings.geojson",
+    # FlatGeobuf from generate_sample_data.py, else a GeoJSON export (e.g. OSM)
+    "buildings": next(
+        (p for p in (RAW_DATA_DIR / "buildings.fgb", RAW_DATA_DIR / "buildings.geojson") if p.exists()),
+        RAW_DATA_DIR / "buildings.geojson"
+    ),
     "population": RAW_DATA_DIR / "population.tif",
     "landslide_inventory": RAW_DATA_DIR / "landslide_inventory.geojson",
 }
@@ -37,11 +53,15 @@ RASTER_CONFIG = {
     "tiled": True,
     "blockxsize": 256,
     "blockysize": 256,
+    "read_threads": "ALL_CPUS",  # GDAL threads for decoding compressed blocks
 }
 
+# Decimal places kept in GeoJSON coordinates (6 decimals is ~0.1 m in EPSG:4326)
+GEOJSON_PRECISION = 6
+
 # Landslide susceptibility settings
 LANDSLIDE_CONFIG = {
-    "model_type": "RandomForest",  # or "XGBoost"
+    "model_type": "RandomForest",  # or "XGBoost", "HistGradientBoosting"
     "n_estimators": 100,
     "max_depth": 10,
     "random_state": 42,
@@ -55,6 +75,7 @@ LANDSLIDE_CONFIG = {
     },
     "feature_names": ["slope", "aspect", "curvature", "rainfall", "landcover"],
     "model_path": MODELS_DIR / "landslide_model.pkl",
+    "predict_block_rows": 256,  # rows of the feature stack predicted per block
 }
 
 # Flood mapping settings
@@ -69,6 +90,7 @@ FLOOD_CONFIG = {
 # Exposure analysis settings
 EXPOSURE_CONFIG = {
     "buffer_distance": 100,  # meters, buffer around buildings for exposure analysis
+    "building_cache_size": 8,  # cached building rasters kept in CACHE_DIR (least recently used dropped)
     "exposure_classes": {
         "very_low": 1,
         "low": 2,
@@ -86,6 +108,12 @@ MULTI_HAZARD_CONFIG = {
         "exposure": 0.2,
     },
     "normalization_method": "min_max",  # or "z_score"
+    # Known min-max ranges of layers, skipping the min/max scan (None = scan)
+    "value_ranges": {
+        "landslide": (0.0, 1.0),  # probability
+        "flood": (0.0, 1.0),  # binary water mask
+        "exposure": None,
+    },
     "classification_thresholds": {
         "very_low": 0.2,
         "low": 0.4,
@@ -129,6 +157,20 @@ API_CONFIG = {
     "max_request_size": 100 * 1024 * 1024,  # 100 MB
 }
 
+# Background job queue settings (Dramatiq + Redis)
+WORKER_CONFIG = {
+    "redis_url": os.environ.get("REDIS_URL", "redis://localhost:6379/0"),
+    "connect_timeout": 2,  # seconds for the startup ping of the broker
+    "job_ttl": 24 * 60 * 60,  # seconds to keep job state in Redis
+    "time_limit_ms": 60 * 60 * 1000,  # maximum pipeline runtime
+    # Processes for pipelines run inline by the API (sync=true or no task queue),
+    # per API worker: the CPUs are shared between WEB_CONCURRENCY gunicorn workers
+    "compute_workers": int(os.environ.get(
+        "COMPUTE_WORKERS",
+        max(1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", 1)))
+    )),
+}
+
 # Logging
 LOGGING_CONFIG = {
     "level": "INFO",
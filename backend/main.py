@@ -13,6 +13,7 @@ from api.hazard import router as hazard_router
 from api.layers import router as layers_router
 from api.preview import router as preview_router
 from config import API_CONFIG, LOGGING_CONFIG
+from workers import start_compute_pool, shutdown_compute_pool, check_task_queue
 
 # Configure logging
 logging.basicConfig(
@@ -59,12 +60,16 @@ async def startup_event():
     logger.info("Pokhara Multi-Hazard Monitoring System")
     logger.info("Starting FastAPI application...")
     logger.info("=" * 60)
+    
+    check_task_queue()
+    start_compute_pool()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown"""
     logger.info("Shutting down application...")
+    shutdown_compute_pool()
 
 
 @app.get("/api/health")
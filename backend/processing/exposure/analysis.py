@@ -3,59 +3,138 @@ Exposure analysis module for multi-hazard system
 Analyzes building and population exposure to hazards
 """
 
+import shutil
+import hashlib
+import weakref
 import numpy as np
 import rasterio
 from rasterio import features
 import geopandas as gpd
+from shapely import STRtree
 from shapely.geometry import Point, box
 from pathlib import Path
 from typing import Tuple, Optional, Dict
 import logging
 
-from ..utils.raster_utils import read_raster, save_cog
+from ..utils.raster_utils import read_raster, save_cog, weighted_sum, weighted_sum_uint8
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config import CACHE_DIR, EXPOSURE_CONFIG
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.debug("Numba not available, using vectorized risk index")
+
+# Spatial indexes of building layers, keyed by id() of the GeoDataFrame
+_building_index_cache: Dict[int, Tuple[weakref.ref, int, STRtree]] = {}
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True)
+    def _risk_kernel(ls, fl, ex, weights, maxima):
+        """Fused normalize + weighted sum in float32, parallel over rows"""
+        out = np.empty(ls.shape, dtype=np.float32)
+        for i in prange(ls.shape[0]):
+            for j in range(ls.shape[1]):
+                out[i, j] = (weights[0] * (np.float32(ls[i, j]) / maxima[0]) +
+                             weights[1] * (np.float32(fl[i, j]) / maxima[1]) +
+                             weights[2] * (np.float32(ex[i, j]) / maxima[2]))
+        return out
+
+
+def _prune_building_cache(cache_dir: Path, max_entries: int) -> None:
+    """
+    Drop the least recently used building rasters beyond max_entries
+    
+    Args:
+        cache_dir: Directory holding cached building rasters
+        max_entries: Number of cached rasters to keep
+    """
+    cached = []
+    for path in cache_dir.glob("buildings_*.tif"):
+        try:
+            cached.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue  # evicted concurrently
+    cached.sort(reverse=True)
+    
+    for _, stale in cached[max_entries:]:
+        stale.unlink(missing_ok=True)
+        logger.info(f"Evicted cached building raster {stale.name}")
+
 
 def rasterize_buildings(
     buildings_path: Path,
     reference_raster_path: Path,
-    output_path: Path
+    output_path: Path,
+    cache_dir: Optional[Path] = None
 ) -> np.ndarray:
     """
     Rasterize building footprints to match reference raster
     
+    Results are cached in cache_dir keyed by the buildings file (path, mtime,
+    size) and the reference grid, so repeat runs skip rasterization. Only the
+    EXPOSURE_CONFIG['building_cache_size'] most recently used rasters are kept.
+    
     Args:
         buildings_path: Path to buildings GeoJSON
         reference_raster_path: Reference raster for extent and resolution
         output_path: Output path for rasterized buildings
+        cache_dir: Directory for cached rasters (defaults to CACHE_DIR)
     
     Returns:
         Building density raster
     """
-    logger.info("Rasterizing building footprints")
-    
-    # Read buildings
-    buildings = gpd.read_file(buildings_path)
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
     
     # Read reference raster for metadata
     with rasterio.open(reference_raster_path) as src:
         profile = src.profile.copy()
         transform = src.transform
         shape = (src.height, src.width)
+        crs = src.crs
+        bounds = src.bounds
+    
+    stat = buildings_path.stat()
+    key_source = f"{buildings_path.resolve()}-{stat.st_mtime_ns}-{stat.st_size}-{transform.to_gdal()}-{shape}-{crs}"
+    key = hashlib.blake2b(key_source.encode(), digest_size=8).hexdigest()
+    cache_path = cache_dir / f"buildings_{key}.tif"
+    
+    if cache_path.exists():
+        logger.info(f"Using cached building raster {cache_path.name}")
+        cache_path.touch()  # mark as recently used
+        building_raster, _ = read_raster(cache_path)
+        if Path(output_path).resolve() != cache_path.resolve():
+            shutil.copyfile(cache_path, output_path)
+        return building_raster
     
-    # Rasterize buildings (count)
-    shapes_gen = ((geom, 1) for geom in buildings.geometry)
+    logger.info("Rasterizing building footprints")
+    
+    # Read only buildings overlapping the reference extent (bbox filter runs in OGR)
+    buildings = gpd.read_file(buildings_path, bbox=tuple(bounds))
+    
+    # Rasterize buildings (presence; default merge replaces, so 1 fits in uint8)
+    shapes_gen = ((geom, 1) for geom in buildings.geometry.values)
     building_raster = features.rasterize(
         shapes=shapes_gen,
         out_shape=shape,
         transform=transform,
         fill=0,
-        dtype=np.uint16
+        dtype=np.uint8
     )
     
     save_cog(building_raster, output_path, profile, nodata=0)
     
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(output_path, cache_path)
+    _prune_building_cache(cache_dir, EXPOSURE_CONFIG['building_cache_size'])
+    
     logger.info(f"Rasterized {len(buildings)} buildings")
     
     return building_raster
@@ -88,32 +167,38 @@ def calculate_exposure_density(
             'population': 0.2
         }
     
-    # Normalize hazard to 0-1
-    hazard_norm = hazard_raster.astype(np.float32)
-    if hazard_norm.max() > 1:
-        hazard_norm = hazard_norm / hazard_norm.max()
+    # Normalization factors (hazard only rescaled if not already 0-1)
+    hazard_max = float(hazard_raster.max())
+    hazard_scale = 1.0 / hazard_max if hazard_max > 1 else 1.0
     
-    # Normalize buildings
-    buildings_norm = buildings_raster.astype(np.float32)
-    if buildings_norm.max() > 0:
-        buildings_norm = buildings_norm / buildings_norm.max()
+    buildings_max = float(buildings_raster.max())
+    buildings_scale = 1.0 / buildings_max if buildings_max > 0 else 1.0
     
-    # Calculate exposure
-    exposure = weights['hazard'] * hazard_norm + weights['buildings'] * buildings_norm
+    arrays = [hazard_raster, buildings_raster]
+    coefficients = [weights['hazard'] * hazard_scale, weights['buildings'] * buildings_scale]
+    maxima = [hazard_max, buildings_max]
     
     # Add population if available
     if population_raster is not None:
-        pop_norm = population_raster.astype(np.float32)
-        if pop_norm.max() > 0:
-            pop_norm = pop_norm / pop_norm.max()
+        pop_max = float(population_raster.max())
+        pop_scale = 1.0 / pop_max if pop_max > 0 else 1.0
+        
+        arrays.append(population_raster)
+        coefficients.append(weights['population'] * pop_scale)
+        maxima.append(pop_max)
         
         # Renormalize weights
         total_weight = sum(weights.values())
-        exposure = (
-            weights['hazard'] / total_weight * hazard_norm +
-            weights['buildings'] / total_weight * buildings_norm +
-            weights['population'] / total_weight * pop_norm
-        )
+        coefficients = [c / total_weight for c in coefficients]
+    
+    # Classified uint8 inputs are combined in uint16 fixed point
+    exposure = None
+    if all(a.dtype == np.uint8 for a in arrays):
+        exposure = weighted_sum_uint8(arrays, coefficients, maxima)
+    
+    # Calculate exposure in one fused pass
+    if exposure is None:
+        exposure = weighted_sum(arrays, coefficients)
     
     logger.info(f"Exposure range: {exposure.min():.3f} - {exposure.max():.3f}")
     
@@ -147,24 +232,25 @@ def calculate_risk_index(
             'exposure': 0.30
         }
     
-    # Normalize all to 0-1
-    def normalize(arr):
-        arr_f = arr.astype(np.float32)
-        if arr_f.max() > 0:
-            return arr_f / arr_f.max()
-        return arr_f
-    
-    ls_norm = normalize(landslide_suscept)
-    flood_norm = normalize(flood_extent)
-    exp_norm = normalize(exposure)
-    
-    # Calculate weighted risk
-    risk = (
-        weights['landslide'] * ls_norm +
-        weights['flood'] * flood_norm +
-        weights['exposure'] * exp_norm
+    # Normalize all to 0-1 (max computed once per input)
+    def max_or_one(arr):
+        arr_max = np.float32(arr.max())
+        return arr_max if arr_max > 0 else np.float32(1)
+    
+    inputs = [landslide_suscept, flood_extent, exposure]
+    maxima = np.array([max_or_one(arr) for arr in inputs], dtype=np.float32)
+    coefficients = np.array(
+        [weights['landslide'], weights['flood'], weights['exposure']], dtype=np.float32
     )
     
+    # Calculate weighted risk in one fused pass
+    if NUMBA_AVAILABLE and landslide_suscept.ndim == 2:
+        risk = _risk_kernel(landslide_suscept, flood_extent, exposure, coefficients, maxima)
+    else:
+        risk = coefficients[0] * (landslide_suscept.astype(np.float32) / maxima[0])
+        for coef, arr, arr_max in zip(coefficients[1:], inputs[1:], maxima[1:]):
+            risk += coef * (arr.astype(np.float32) / arr_max)
+    
     logger.info(f"Risk index range: {risk.min():.3f} - {risk.max():.3f}")
     
     return risk
@@ -192,17 +278,52 @@ def classify_exposure(
             'high': 0.8
         }
     
-    classified = np.zeros_like(exposure, dtype=np.uint8)
+    # Float rasters compare in their own precision, integer rasters against float64 bins
+    bins = np.array([
+        thresholds['very_low'],
+        thresholds['low'],
+        thresholds['moderate'],
+        thresholds['high']
+    ], dtype=exposure.dtype if np.issubdtype(exposure.dtype, np.floating) else np.float64)
+    
+    # side='left' gives the bin with bins[k-1] < value <= bins[k] (inclusive upper bounds)
+    classified = np.searchsorted(bins, exposure, side='left').astype(np.uint8)
+    classified += 1
     
-    classified[exposure <= thresholds['very_low']] = 1
-    classified[(exposure > thresholds['very_low']) & (exposure <= thresholds['low'])] = 2
-    classified[(exposure > thresholds['low']) & (exposure <= thresholds['moderate'])] = 3
-    classified[(exposure > thresholds['moderate']) & (exposure <= thresholds['high'])] = 4
-    classified[exposure > thresholds['high']] = 5
+    # NaN exposure stays unclassified
+    if np.issubdtype(exposure.dtype, np.floating):
+        classified[np.isnan(exposure)] = 0
     
     return classified
 
 
+def _building_index(buildings_gdf: gpd.GeoDataFrame) -> STRtree:
+    """
+    Get an STRtree over building geometries, built once per GeoDataFrame
+    
+    Args:
+        buildings_gdf: Buildings GeoDataFrame
+    
+    Returns:
+        STRtree whose indices are positions in buildings_gdf
+    """
+    key = id(buildings_gdf)
+    cached = _building_index_cache.get(key)
+    
+    # Guard against id() reuse after the original frame was collected
+    if cached is not None and cached[0]() is buildings_gdf and cached[1] == len(buildings_gdf):
+        return cached[2]
+    
+    tree = STRtree(buildings_gdf.geometry.values)
+    
+    # Drop stale entries so the cache does not keep trees of dead frames
+    for stale in [k for k, v in _building_index_cache.items() if v[0]() is None]:
+        del _building_index_cache[stale]
+    _building_index_cache[key] = (weakref.ref(buildings_gdf), len(buildings_gdf), tree)
+    
+    return tree
+
+
 def count_exposed_buildings(
     buildings_gdf: gpd.GeoDataFrame,
     hazard_zones_gdf: gpd.GeoDataFrame,
@@ -221,11 +342,14 @@ def count_exposed_buildings(
     """
     logger.info("Counting exposed buildings")
     
-    # Spatial join
-    exposed = gpd.sjoin(buildings_gdf, hazard_zones_gdf, how='inner', predicate='intersects')
+    # Query the cached building index with all zones at once
+    tree = _building_index(buildings_gdf)
+    zone_idx, _ = tree.query(hazard_zones_gdf.geometry.values, predicate='intersects')
     
-    # Count by hazard class
-    counts = exposed[hazard_class_field].value_counts().to_dict()
+    # Count (building, zone) matches by hazard class
+    zone_classes = hazard_zones_gdf[hazard_class_field].to_numpy()
+    classes, class_counts = np.unique(zone_classes[zone_idx], return_counts=True)
+    counts = dict(zip(classes.tolist(), class_counts.tolist()))
     
     logger.info(f"Exposed buildings by class: {counts}")
     
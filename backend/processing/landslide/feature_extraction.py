@@ -3,22 +3,167 @@ Feature extraction module for landslide susceptibility modeling
 Extracts terrain and environmental features from DEM and other inputs
 """
 
+import os
 import numpy as np
 import rasterio
+from rasterio.windows import Window
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional, Iterator
 import logging
 
 from ..utils.raster_utils import (
-    calculate_slope,
-    calculate_aspect,
-    calculate_curvature,
+    calculate_terrain_derivatives,
+    calculate_terrain_derivatives_gpu,
+    CUPY_AVAILABLE,
     read_raster,
     save_cog
 )
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.debug("Numba not available, using NumPy for feature validity masks")
+
+
+if NUMBA_AVAILABLE:
+    # No fastmath: it would let the compiler assume NaN never occurs
+    @njit(parallel=True)
+    def _valid_mask_kernel(features, nodata):
+        """Per-pixel validity over all bands in one fused pass"""
+        n_bands, height, width = features.shape
+        valid = np.empty((height, width), dtype=np.bool_)
+        for i in prange(height):
+            for j in range(width):
+                ok = True
+                for b in range(n_bands):
+                    v = features[b, i, j]
+                    # v != v is the NaN test and is always False for integer stacks
+                    if v != v or v == nodata:
+                        ok = False
+                        break
+                valid[i, j] = ok
+        return valid
+
+
+def valid_pixel_mask(features: np.ndarray, nodata: float = -9999) -> np.ndarray:
+    """
+    Find pixels where no feature band is NaN or nodata
+    
+    Args:
+        features: Feature stack (n_bands, height, width)
+        nodata: NoData sentinel value
+    
+    Returns:
+        Boolean mask (height, width)
+    """
+    if NUMBA_AVAILABLE:
+        return _valid_mask_kernel(features, features.dtype.type(nodata))
+    
+    is_float = np.issubdtype(features.dtype, np.floating)
+    valid = np.ones(features.shape[1:], dtype=bool)
+    for band in features:
+        if is_float:
+            valid &= ~np.isnan(band)
+        valid &= band != nodata
+    return valid
+
+
+# int16 code reserved for nodata in quantized feature stacks
+QUANTIZED_NODATA = -32768
+QUANTIZED_MAX = 32767
+
+
+def quantize_band(band: np.ndarray, nodata: float = -9999) -> Tuple[np.ndarray, float, float]:
+    """
+    Quantize a float band to int16 codes with a linear scale and offset
+    
+    Valid values map onto [-32767, 32767]; NaN and nodata map to QUANTIZED_NODATA.
+    
+    Args:
+        band: Float feature band (height, width)
+        nodata: NoData sentinel value of the input
+    
+    Returns:
+        Tuple of (codes, scale, offset) where value = code * scale + offset
+    """
+    valid = valid_pixel_mask(band[np.newaxis], nodata)
+    codes = np.full(band.shape, QUANTIZED_NODATA, dtype=np.int16)
+    
+    if not valid.any():
+        return codes, 1.0, 0.0
+    
+    lo = float(band.min(where=valid, initial=np.inf))
+    hi = float(band.max(where=valid, initial=-np.inf))
+    
+    scale = (hi - lo) / (2 * QUANTIZED_MAX) if hi > lo else 1.0
+    offset = lo + QUANTIZED_MAX * scale
+    
+    quantized = np.rint((band - offset) / scale)
+    np.clip(quantized, -QUANTIZED_MAX, QUANTIZED_MAX, out=quantized)
+    np.copyto(codes, quantized, casting='unsafe', where=valid)
+    
+    return codes, scale, offset
+
+
+def dequantize_samples(
+    samples: np.ndarray,
+    scales: Tuple[float, ...],
+    offsets: Tuple[float, ...],
+    nodata: Optional[float],
+    fill_value: float = -9999
+) -> np.ndarray:
+    """
+    Convert stored feature samples back to float32 feature values
+    
+    Args:
+        samples: Raw samples read from the stack (n_samples, n_bands)
+        scales: Per-band scale factors of the stack
+        offsets: Per-band offsets of the stack
+        nodata: NoData value of the stack
+        fill_value: Value written for nodata samples
+    
+    Returns:
+        Float32 samples (n_samples, n_bands)
+    """
+    # Row-major so each sample's features are contiguous for tree traversal
+    values = np.array(samples, dtype=np.float32, order='C')
+    values *= np.asarray(scales, dtype=np.float32)
+    values += np.asarray(offsets, dtype=np.float32)
+    
+    if nodata is not None:
+        values[samples == nodata] = fill_value
+    
+    return values
+
+
+def bip_stack_path(feature_stack_path: Path) -> Path:
+    """Path of the pixel-interleaved (H, W, n_bands) copy of a feature stack"""
+    return Path(feature_stack_path).with_suffix('.bip.npy')
+
+
+def open_bip_stack(feature_stack_path: Path) -> Optional[np.ndarray]:
+    """
+    Memory-map the pixel-interleaved copy of a feature stack
+    
+    Args:
+        feature_stack_path: Path to stacked feature raster
+    
+    Returns:
+        Read-only memmap (height, width, n_bands) of stored codes, or None if
+        the copy is missing or older than the stack
+    """
+    bip_path = bip_stack_path(feature_stack_path)
+    
+    if not bip_path.exists() or bip_path.stat().st_mtime_ns < Path(feature_stack_path).stat().st_mtime_ns:
+        return None
+    
+    return np.load(bip_path, mmap_mode='r')
+
 
 def extract_terrain_features(
     dem_path: Path,
@@ -41,21 +186,29 @@ def extract_terrain_features(
     # Read DEM
     dem_array, profile = read_raster(dem_path)
     
-    # Calculate derivatives
-    slope = calculate_slope(dem_array, cell_size)
-    aspect = calculate_aspect(dem_array)
-    curvature = calculate_curvature(dem_array, cell_size)
+    # Single-precision throughout; 30 m elevations need no more
+    dem_array = dem_array.astype(np.float32, copy=False)
     
-    # Save outputs
     output_dir.mkdir(parents=True, exist_ok=True)
     
     slope_path = output_dir / "slope.tif"
     aspect_path = output_dir / "aspect.tif"
     curvature_path = output_dir / "curvature.tif"
     
-    save_cog(slope, slope_path, profile)
-    save_cog(aspect, aspect_path, profile)
-    save_cog(curvature, curvature_path, profile)
+    if CUPY_AVAILABLE:
+        # All three derivatives from a single host-to-device copy of the DEM
+        derivatives = calculate_terrain_derivatives_gpu(dem_array, cell_size)
+    else:
+        # Slope and aspect share one pair of gradient passes over the DEM
+        derivatives = calculate_terrain_derivatives(dem_array, cell_size)
+    
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(save_cog, array, path, profile.copy())
+            for array, path in zip(derivatives, (slope_path, aspect_path, curvature_path))
+        ]
+        for future in futures:
+            future.result()
     
     logger.info(f"Terrain features saved to {output_dir}")
     
@@ -69,6 +222,11 @@ def stack_features(
     """
     Stack multiple feature rasters into a single multi-band raster
     
+    Bands are stored as int16 with per-band scale/offset (see quantize_band),
+    halving the size of the stack read back for training and prediction. The
+    same codes are also written pixel-interleaved to a .bip.npy file so that
+    training samples are contiguous reads.
+    
     Args:
         feature_paths: List of paths to feature rasters
         output_path: Path to save stacked output
@@ -85,22 +243,53 @@ def stack_features(
     
     # Initialize stack
     n_features = len(feature_paths)
-    stack = np.zeros((n_features, height, width), dtype=np.float32)
+    stack = np.empty((n_features, height, width), dtype=np.float32)
+    
+    def read_band(i):
+        with rasterio.open(feature_paths[i]) as src:
+            src.read(1, out=stack[i])
     
-    # Read each feature
-    for i, feature_path in enumerate(feature_paths):
-        array, _ = read_raster(feature_path)
-        stack[i] = array
+    # Read each feature straight into its band of the stack; GDAL decodes
+    # the rasters concurrently with the GIL released
+    with ThreadPoolExecutor(max_workers=n_features) as executor:
+        list(executor.map(read_band, range(n_features)))
     
-    # Update profile for multi-band
+    nodata = profile.get('nodata')
+    if nodata is None:
+        nodata = -9999
+    
+    # Update profile for multi-band quantized stack
     profile.update({
         'count': n_features,
-        'dtype': 'float32'
+        'dtype': 'int16',
+        'nodata': QUANTIZED_NODATA
     })
     
-    # Save stacked raster
-    with rasterio.open(output_path, 'w', **profile) as dst:
-        dst.write(stack)
+    # Pixel-interleaved copy for point sampling
+    bip = np.lib.format.open_memmap(
+        bip_stack_path(output_path), mode='w+', dtype=np.int16,
+        shape=(height, width, n_features)
+    )
+    
+    # Save stacked raster; bands are quantized in parallel and written in order
+    scales, offsets = [], []
+    with rasterio.open(output_path, 'w', **profile) as dst, \
+            ThreadPoolExecutor(max_workers=n_features) as executor:
+        quantized = executor.map(lambda band: quantize_band(band, nodata), stack)
+        for i, (codes, scale, offset) in enumerate(quantized):
+            dst.write(codes, i + 1)
+            bip[:, :, i] = codes
+            scales.append(scale)
+            offsets.append(offset)
+        
+        dst.scales = scales
+        dst.offsets = offsets
+    
+    bip.flush()
+    del bip
+    
+    # Touch after the GeoTIFF is closed so the copy is never older than the stack
+    os.utime(bip_stack_path(output_path))
     
     logger.info(f"Stacked features saved to {output_path}")
     
@@ -127,26 +316,34 @@ def prepare_training_features(
     
     logger.info("Preparing training data")
     
-    # Read feature stack
+    # Read feature stack as (height, width, n_bands), memory-mapped when the
+    # pixel-interleaved copy exists
     with rasterio.open(feature_stack_path) as src:
-        features = src.read()  # (n_bands, height, width)
+        features = open_bip_stack(feature_stack_path)
+        if features is None:
+            features = src.read().transpose(1, 2, 0)
         transform = src.transform
+        nodata = src.nodata if src.nodata is not None else -9999
+        scales, offsets = src.scales, src.offsets
         
         # Read landslide inventory
         landslides = gpd.read_file(landslide_inventory_path)
         
         # Extract feature values at landslide locations (positive samples)
-        positive_samples = []
-        for idx, point in landslides.iterrows():
-            # Get pixel coordinates
-            py, px = rasterio.transform.rowcol(transform, point.geometry.x, point.geometry.y)
-            
-            # Extract feature values
-            if 0 <= py < features.shape[1] and 0 <= px < features.shape[2]:
-                sample = features[:, py, px]
-                positive_samples.append(sample)
+        xs = landslides.geometry.x.to_numpy()
+        ys = landslides.geometry.y.to_numpy()
+        rows, cols = rasterio.transform.rowcol(transform, xs, ys)
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
         
-        positive_samples = np.array(positive_samples)
+        # Keep points inside the raster and gather their features in one step
+        in_bounds = (
+            (rows >= 0) & (rows < features.shape[0]) &
+            (cols >= 0) & (cols < features.shape[1])
+        )
+        positive_samples = dequantize_samples(
+            features[rows[in_bounds], cols[in_bounds]], scales, offsets, nodata
+        )
         n_positive = len(positive_samples)
         
         logger.info(f"Extracted {n_positive} positive samples")
@@ -155,26 +352,24 @@ def prepare_training_features(
         if n_negative_samples is None:
             n_negative_samples = n_positive  # Balance classes
         
-        negative_samples = []
-        height, width = features.shape[1], features.shape[2]
+        height, width, n_bands = features.shape
         
-        # Simple random sampling (in practice, should avoid landslide areas)
-        attempts = 0
-        max_attempts = n_negative_samples * 10
+        # Pixels where every feature is valid
+        valid_mask = valid_pixel_mask(features.transpose(2, 0, 1), nodata)
         
-        while len(negative_samples) < n_negative_samples and attempts < max_attempts:
-            py = np.random.randint(0, height)
-            px = np.random.randint(0, width)
-            
-            sample = features[:, py, px]
-            
-            # Check if any feature is nodata
-            if not np.any(np.isnan(sample)) and not np.any(sample == -9999):
-                negative_samples.append(sample)
-            
-            attempts += 1
+        # Exclude landslide pixels from the negative pool
+        valid_mask[rows[in_bounds], cols[in_bounds]] = False
+        
+        # Draw all negative locations at once, without replacement
+        valid_flat = np.flatnonzero(valid_mask)
+        n_negative_samples = min(n_negative_samples, len(valid_flat))
         
-        negative_samples = np.array(negative_samples)
+        rng = np.random.default_rng()
+        choice = rng.choice(valid_flat, size=n_negative_samples, replace=False)
+        neg_rows, neg_cols = np.unravel_index(choice, (height, width))
+        negative_samples = dequantize_samples(
+            features[neg_rows, neg_cols], scales, offsets, nodata
+        )
         logger.info(f"Generated {len(negative_samples)} negative samples")
         
         # Combine positive and negative
@@ -190,23 +385,30 @@ def extract_features_for_prediction(feature_stack_path: Path) -> Tuple[np.ndarra
     """
     Extract features for prediction over entire area
     
+    Loads the whole stack at once; prediction itself streams the stack through
+    iter_prediction_blocks instead.
+    
     Args:
         feature_stack_path: Path to stacked feature raster
     
     Returns:
         Tuple of (features_2d, metadata) where features_2d is (n_pixels, n_features)
+        and metadata['valid_mask'] marks the valid pixels
     """
     with rasterio.open(feature_stack_path) as src:
-        features = src.read()  # (n_bands, height, width)
+        features = src.read()  # (n_bands, height, width), stored codes
         profile = src.profile.copy()
+        nodata = src.nodata if src.nodata is not None else -9999
         
-        # Reshape to (n_pixels, n_features)
         n_bands, height, width = features.shape
-        features_2d = features.reshape(n_bands, -1).T
         
-        # Create mask for valid pixels
-        valid_mask = ~np.any(np.isnan(features_2d), axis=1)
-        valid_mask &= ~np.any(features_2d == -9999, axis=1)
+        # Create mask for valid pixels in one fused pass over the stored stack
+        valid_mask = valid_pixel_mask(features, nodata).ravel()
+        
+        # Reshape to (n_pixels, n_features) and dequantize
+        features_2d = dequantize_samples(
+            features.reshape(n_bands, -1).T, src.scales, src.offsets, nodata
+        )
         
         metadata = {
             'profile': profile,
@@ -215,3 +417,40 @@ def extract_features_for_prediction(feature_stack_path: Path) -> Tuple[np.ndarra
         }
         
         return features_2d, metadata
+
+
+def iter_prediction_blocks(
+    feature_stack_path: Path,
+    block_rows: int = 256
+) -> Iterator[Tuple[Window, np.ndarray, np.ndarray]]:
+    """
+    Stream the feature stack in full-width row blocks for prediction
+    
+    block_rows is rounded up to a multiple of the stack's internal block
+    height so each tile is decoded only once.
+    
+    Args:
+        feature_stack_path: Path to stacked feature raster
+        block_rows: Number of raster rows per block
+    
+    Yields:
+        Tuples of (window, features_2d, valid_mask) where features_2d holds the
+        dequantized valid pixels of the block (n_valid, n_features) and
+        valid_mask is the block's (rows, width) validity mask
+    """
+    with rasterio.open(feature_stack_path) as src:
+        nodata = src.nodata if src.nodata is not None else -9999
+        n_bands = src.count
+        
+        tile_rows = src.block_shapes[0][0]
+        block_rows = -(-block_rows // tile_rows) * tile_rows
+        
+        for row_off in range(0, src.height, block_rows):
+            window = Window(0, row_off, src.width, min(block_rows, src.height - row_off))
+            codes = src.read(window=window)
+            
+            valid_mask = valid_pixel_mask(codes, nodata)
+            valid_codes = codes.reshape(n_bands, -1)[:, valid_mask.ravel()].T
+            features_2d = dequantize_samples(valid_codes, src.scales, src.offsets, None)
+            
+            yield window, features_2d, valid_mask
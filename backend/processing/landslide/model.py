@@ -4,28 +4,31 @@ Implements Random Forest and XGBoost classifiers
 """
 
 import numpy as np
-import pickle
+import joblib
 from pathlib import Path
 from typing import Tuple, Optional
-from sklearn.ensemble import RandomForestClassifier
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, roc_auc_score
 import logging
 
+logger = logging.getLogger(__name__)
+
 try:
     import xgboost as xgb
     XGBOOST_AVAILABLE = True
 except ImportError:
     XGBOOST_AVAILABLE = False
-    logging.warning("XGBoost not available, using Random Forest only")
+    logger.info("XGBoost not available, using Random Forest only")
 
-logger = logging.getLogger(__name__)
+# Rows scored per predict_proba call, keeping the per-tree working set cache-sized
+PREDICT_BATCH_SIZE = 65536
 
 
 class LandslideModel:
     """
     Landslide susceptibility model wrapper
-    Supports Random Forest and XGBoost
+    Supports Random Forest, XGBoost and histogram gradient boosting
     """
     
     def __init__(self, model_type: str = "RandomForest", **params):
@@ -33,7 +36,7 @@ class LandslideModel:
         Initialize model
         
         Args:
-            model_type: "RandomForest" or "XGBoost"
+            model_type: "RandomForest", "XGBoost" or "HistGradientBoosting"
             **params: Model hyperparameters
         """
         self.model_type = model_type
@@ -81,7 +84,17 @@ class LandslideModel:
                 max_depth=self.params.get('max_depth', 10),
                 random_state=random_state,
                 n_jobs=-1,
-                eval_metric='logloss'
+                eval_metric='logloss',
+                # Features are binned once into at most 255 uint8 bins
+                tree_method='hist',
+                max_bin=255
+            )
+        elif self.model_type == "HistGradientBoosting":
+            self.model = HistGradientBoostingClassifier(
+                max_iter=self.params.get('n_estimators', 100),
+                max_depth=self.params.get('max_depth', 10),
+                max_bins=255,
+                random_state=random_state
             )
         else:
             raise ValueError(f"Unsupported model type: {self.model_type}")
@@ -120,39 +133,53 @@ class LandslideModel:
         
         return self.model.predict(X)
     
-    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+    def predict_proba(self, X: np.ndarray, batch_size: int = PREDICT_BATCH_SIZE) -> np.ndarray:
         """
         Predict landslide probability
         
         Args:
             X: Feature matrix (n_samples, n_features)
+            batch_size: Rows scored per call to the underlying model
         
         Returns:
-            Probabilities for positive class (n_samples,)
+            Probabilities for positive class (n_samples,), float32 like the
+            probability raster they are written into
         """
         if self.model is None:
             raise ValueError("Model not trained yet")
         
-        return self.model.predict_proba(X)[:, 1]
+        # Trees traverse float32 rows; hand them over without an internal copy
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        probabilities = np.empty(len(X), dtype=np.float32)
+        
+        # Tree-parallel inference in threads sharing X (no pickling to workers)
+        with joblib.parallel_backend('threading', n_jobs=-1):
+            for start in range(0, len(X), batch_size):
+                batch = X[start:start + batch_size]
+                probabilities[start:start + len(batch)] = self.model.predict_proba(batch)[:, 1]
+        
+        return probabilities
     
     def get_feature_importance(self) -> np.ndarray:
         """Get feature importance scores"""
         if self.model is None:
             raise ValueError("Model not trained yet")
         
+        if not hasattr(self.model, 'feature_importances_'):
+            raise ValueError(f"{self.model_type} model does not provide feature importances")
+        
         return self.model.feature_importances_
     
     def save(self, file_path: Path) -> None:
-        """Save model to disk"""
-        with open(file_path, 'wb') as f:
-            pickle.dump(self, f)
+        """Save model to disk (joblib, uncompressed so tree arrays can be memory-mapped)"""
+        joblib.dump(self, file_path)
         logger.info(f"Model saved to {file_path}")
     
     @staticmethod
     def load(file_path: Path) -> 'LandslideModel':
-        """Load model from disk"""
-        with open(file_path, 'rb') as f:
-            model = pickle.load(f)
+        """Load model from disk (also reads compressed and plain pickle models)"""
+        # Tree arrays are mapped from the page cache instead of read into buffers
+        model = joblib.load(file_path, mmap_mode='r')
         logger.info(f"Model loaded from {file_path}")
         return model
 
@@ -172,36 +199,23 @@ def classify_susceptibility(
     Returns:
         Classification array with values 1-5
     """
-    classified = np.zeros_like(probabilities, dtype=np.uint8)
-    
-    # Define class values
-    class_mapping = {
-        'very_low': 1,
-        'low': 2,
-        'moderate': 3,
-        'high': 4,
-        'very_high': 5
-    }
-    
-    # Sort thresholds
-    sorted_classes = ['very_low', 'low', 'moderate', 'high', 'very_high']
-    
-    for i, class_name in enumerate(sorted_classes[:-1]):
-        if class_name in thresholds:
-            threshold = thresholds[class_name]
-            
-            if i == 0:
-                mask = probabilities <= threshold
-            else:
-                prev_class = sorted_classes[i-1]
-                prev_threshold = thresholds.get(prev_class, 0)
-                mask = (probabilities > prev_threshold) & (probabilities <= threshold)
-            
-            classified[mask] = class_mapping[class_name]
-    
-    # Very high (above highest threshold)
-    if 'high' in thresholds:
-        classified[probabilities > thresholds['high']] = class_mapping['very_high']
+    # Class upper bounds; class k covers (bins[k-2], bins[k-1]], class 5 is above 'high'
+    # Float rasters compare in their own precision, integer rasters against float64 bins
+    bins = np.array([
+        thresholds['very_low'],
+        thresholds['low'],
+        thresholds['moderate'],
+        thresholds['high']
+    ], dtype=probabilities.dtype if np.issubdtype(probabilities.dtype, np.floating) else np.float64)
+    
+    # Single binary-search pass over the raster
+    # side='left' gives the bin with bins[k-1] < value <= bins[k] (inclusive upper bounds)
+    classified = np.searchsorted(bins, probabilities, side='left').astype(np.uint8)
+    classified += 1
+    
+    # NaN probabilities stay unclassified
+    if np.issubdtype(probabilities.dtype, np.floating):
+        classified[np.isnan(probabilities)] = 0
     
     return classified
 
@@ -4,6 +4,9 @@ Orchestrates feature extraction, model training/inference, and output generation
 """
 
 import numpy as np
+import rasterio
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict
 import logging
@@ -12,7 +15,7 @@ from .feature_extraction import (
     extract_terrain_features,
     stack_features,
     prepare_training_features,
-    extract_features_for_prediction
+    iter_prediction_blocks
 )
 from .model import LandslideModel, classify_susceptibility, train_and_save_model
 from ..utils.raster_utils import save_cog, raster_to_geojson
@@ -23,6 +26,58 @@ from config import LANDSLIDE_CONFIG, PROCESSED_DATA_DIR, OUTPUTS_DIR, INPUT_FILE
 logger = logging.getLogger(__name__)
 
 
+def predict_susceptibility(
+    model: LandslideModel,
+    feature_stack_path: Path,
+    block_rows: int = 256,
+    out_path: Optional[Path] = None
+) -> np.ndarray:
+    """
+    Predict landslide probability over the feature stack block by block
+    
+    Each block is predicted in a background thread while the next one is read,
+    so only two blocks of features are in memory at a time. With out_path the
+    probabilities are written to a disk-backed .npy memmap instead of RAM.
+    
+    Args:
+        model: Trained landslide model
+        feature_stack_path: Path to stacked feature raster
+        block_rows: Number of raster rows per block
+        out_path: Optional .npy file backing the probability raster
+    
+    Returns:
+        Probability raster (height, width), 0 where features are invalid
+    """
+    with rasterio.open(feature_stack_path) as src:
+        shape = src.shape
+    
+    if out_path is not None:
+        # New file is zero-filled, so invalid pixels need no writes
+        probabilities = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32, shape=shape)
+    else:
+        probabilities = np.zeros(shape, dtype=np.float32)
+    
+    def store(window, valid_mask, future):
+        if future is not None:
+            rows = slice(window.row_off, window.row_off + window.height)
+            probabilities[rows][valid_mask] = future.result()
+    
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = None
+        for window, features_2d, valid_mask in iter_prediction_blocks(feature_stack_path, block_rows):
+            future = executor.submit(model.predict_proba, features_2d) if len(features_2d) else None
+            
+            # Collect the previous block while this one is being predicted
+            if pending is not None:
+                store(*pending)
+            pending = (window, valid_mask, future)
+        
+        if pending is not None:
+            store(*pending)
+    
+    return probabilities
+
+
 def run_landslide_pipeline(
     dem_path: Optional[Path] = None,
     landcover_path: Optional[Path] = None,
@@ -131,35 +186,46 @@ def run_landslide_pipeline(
     # STEP 4: Predict susceptibility over entire area
     logger.info("Step 4: Predicting landslide susceptibility")
     
-    features_2d, metadata = extract_features_for_prediction(feature_stack_path)
-    valid_mask = metadata['valid_mask']
-    shape = metadata['shape']
-    profile = metadata['profile']
-    
-    # Predict probabilities
-    probabilities_flat = np.zeros(features_2d.shape[0])
-    probabilities_flat[valid_mask] = model.predict_proba(features_2d[valid_mask])
-    
-    # Reshape to raster
-    probabilities = probabilities_flat.reshape(shape)
-    
-    # Save probability raster
-    probability_path = output_dir / "landslide_susceptibility_probability.tif"
-    save_cog(probabilities, probability_path, profile, nodata=0)
-    outputs['probability'] = probability_path
+    with rasterio.open(feature_stack_path) as src:
+        profile = src.profile.copy()
     
-    # STEP 5: Classify into susceptibility zones
-    logger.info("Step 5: Classifying susceptibility zones")
+    # Predict probabilities in row blocks, overlapping reads with inference,
+    # into a scratch memmap so the full raster never has to fit in RAM.
+    # The scratch file is unique per run so concurrent pipelines never share it.
+    with tempfile.NamedTemporaryFile(
+        prefix="landslide_probability_", suffix=".npy", dir=PROCESSED_DATA_DIR, delete=False
+    ) as scratch:
+        probability_scratch_path = Path(scratch.name)
     
-    classified = classify_susceptibility(
-        probabilities=probabilities,
-        thresholds=LANDSLIDE_CONFIG['classification_thresholds']
-    )
-    
-    # Save classified raster
-    classified_path = output_dir / "landslide_susceptibility_classified.tif"
-    save_cog(classified, classified_path, profile, nodata=0)
-    outputs['classified_raster'] = classified_path
+    try:
+        probabilities = predict_susceptibility(
+            model,
+            feature_stack_path,
+            block_rows=LANDSLIDE_CONFIG['predict_block_rows'],
+            out_path=probability_scratch_path
+        )
+        
+        # Save probability raster
+        probability_path = output_dir / "landslide_susceptibility_probability.tif"
+        save_cog(probabilities, probability_path, profile, nodata=0)
+        outputs['probability'] = probability_path
+        
+        # STEP 5: Classify into susceptibility zones
+        logger.info("Step 5: Classifying susceptibility zones")
+        
+        classified = classify_susceptibility(
+            probabilities=probabilities,
+            thresholds=LANDSLIDE_CONFIG['classification_thresholds']
+        )
+        
+        # Save classified raster
+        classified_path = output_dir / "landslide_susceptibility_classified.tif"
+        save_cog(classified, classified_path, profile, nodata=0)
+        outputs['classified_raster'] = classified_path
+        
+        del probabilities, classified
+    finally:
+        probability_scratch_path.unlink(missing_ok=True)
     
     # STEP 6: Convert to GeoJSON
     logger.info("Step 6: Converting to GeoJSON")
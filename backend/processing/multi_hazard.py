@@ -5,45 +5,55 @@ Combines landslide, flood, and exposure into composite risk map
 
 import numpy as np
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 import logging
 
-from processing.utils.raster_utils import read_raster, save_cog, raster_to_geojson
+from processing.utils.raster_utils import read_raster, save_cog, raster_to_geojson, weighted_sum
 from config import MULTI_HAZARD_CONFIG, OUTPUTS_DIR
 
 logger = logging.getLogger(__name__)
 
 
-def normalize_raster(array: np.ndarray, method: str = "min_max") -> np.ndarray:
+def normalize_raster(
+    array: np.ndarray,
+    method: str = "min_max",
+    value_range: Optional[Tuple[float, float]] = None
+) -> np.ndarray:
     """
     Normalize raster values to 0-1 range
     
     Args:
         array: Input array
         method: "min_max" or "z_score"
+        value_range: Known (min, max) of the data for "min_max", skipping the scan
     
     Returns:
         Normalized array
     """
+    # Always a fresh copy, so it can be normalized in place
     array_f = array.astype(np.float32)
     
     if method == "min_max":
-        min_val = array_f.min()
-        max_val = array_f.max()
+        if value_range is not None:
+            min_val, max_val = value_range
+        else:
+            min_val = array_f.min()
+            max_val = array_f.max()
         
         if max_val > min_val:
-            normalized = (array_f - min_val) / (max_val - min_val)
-        else:
-            normalized = array_f
+            array_f -= min_val
+            array_f /= max_val - min_val
+        normalized = array_f
     
     elif method == "z_score":
         mean = array_f.mean()
         std = array_f.std()
         
         if std > 0:
-            normalized = (array_f - mean) / std
+            array_f -= mean
+            array_f /= std
             # Clip to 0-1
-            normalized = np.clip(normalized, 0, 1)
+            normalized = np.clip(array_f, 0, 1, out=array_f)
         else:
             normalized = array_f
     
@@ -53,6 +63,36 @@ def normalize_raster(array: np.ndarray, method: str = "min_max") -> np.ndarray:
     return normalized
 
 
+def min_max_coefficients(
+    array: np.ndarray,
+    value_range: Optional[Tuple[float, float]] = None
+) -> tuple:
+    """
+    Express min-max normalization as an affine map scale * array + shift
+    
+    Matches normalize_raster(array, "min_max", value_range), including
+    leaving constant rasters unscaled.
+    
+    Args:
+        array: Input array
+        value_range: Known (min, max) of the data, skipping the scan
+    
+    Returns:
+        Tuple of (scale, shift)
+    """
+    if value_range is not None:
+        min_val, max_val = (float(v) for v in value_range)
+    else:
+        min_val = float(array.min())
+        max_val = float(array.max())
+    
+    if max_val > min_val:
+        scale = 1.0 / (max_val - min_val)
+        return scale, -min_val * scale
+    
+    return 1.0, 0.0
+
+
 def combine_hazards(
     landslide_path: Path,
     flood_path: Path,
@@ -81,38 +121,49 @@ def combine_hazards(
     if weights is None:
         weights = MULTI_HAZARD_CONFIG['weights']
     
+    method = MULTI_HAZARD_CONFIG['normalization_method']
+    value_ranges = MULTI_HAZARD_CONFIG.get('value_ranges', {})
+    
     # Read landslide
     logger.info(f"Reading landslide from {landslide_path}")
     landslide, profile = read_raster(landslide_path)
-    landslide_norm = normalize_raster(landslide, MULTI_HAZARD_CONFIG['normalization_method'])
+    layers = {'landslide': landslide}
     
     # Read flood
     logger.info(f"Reading flood from {flood_path}")
-    flood, _ = read_raster(flood_path)
-    flood_norm = normalize_raster(flood, MULTI_HAZARD_CONFIG['normalization_method'])
-    
-    # Initialize risk
-    risk = weights['landslide'] * landslide_norm + weights['flood'] * flood_norm
+    layers['flood'], _ = read_raster(flood_path)
     
     # Add exposure if available
     if exposure_path and exposure_path.exists():
         logger.info(f"Reading exposure from {exposure_path}")
-        exposure, _ = read_raster(exposure_path)
-        exposure_norm = normalize_raster(exposure, MULTI_HAZARD_CONFIG['normalization_method'])
-        
-        # Recalculate with all three
-        total_weight = sum(weights.values())
-        risk = (
-            weights['landslide'] / total_weight * landslide_norm +
-            weights['flood'] / total_weight * flood_norm +
-            weights['exposure'] / total_weight * exposure_norm
-        )
+        layers['exposure'], _ = read_raster(exposure_path)
+    
+    # Weights are renormalized over the layers present
+    total_weight = sum(weights[name] for name in layers)
+    
+    if method == "min_max":
+        # Min-max is affine, so normalization folds into the weighted sum's
+        # coefficients and the risk map is produced in one fused pass
+        coefficients = []
+        offset = 0.0
+        for name, array in layers.items():
+            scale, shift = min_max_coefficients(array, value_ranges.get(name))
+            weight = weights[name] / total_weight
+            coefficients.append(weight * scale)
+            offset += weight * shift
+        # The landslide raster is ours and not needed afterwards, so a float32
+        # one doubles as the output buffer
+        out = landslide if landslide.dtype == np.float32 else None
+        risk = weighted_sum(list(layers.values()), coefficients, offset, out=out)
     else:
-        # Normalize without exposure
-        total_weight = weights['landslide'] + weights['flood']
-        risk = (
-            weights['landslide'] / total_weight * landslide_norm +
-            weights['flood'] / total_weight * flood_norm
+        normalized = [
+            normalize_raster(array, method, value_ranges.get(name))
+            for name, array in layers.items()
+        ]
+        risk = weighted_sum(
+            normalized,
+            [weights[name] / total_weight for name in layers],
+            out=normalized[0]
         )
     
     logger.info(f"Combined risk range: {risk.min():.3f} - {risk.max():.3f}")
@@ -142,13 +193,23 @@ def classify_risk(
     if thresholds is None:
         thresholds = MULTI_HAZARD_CONFIG['classification_thresholds']
     
-    classified = np.zeros_like(risk_array, dtype=np.uint8)
-    
-    classified[risk_array <= thresholds['very_low']] = 1
-    classified[(risk_array > thresholds['very_low']) & (risk_array <= thresholds['low'])] = 2
-    classified[(risk_array > thresholds['low']) & (risk_array <= thresholds['moderate'])] = 3
-    classified[(risk_array > thresholds['moderate']) & (risk_array <= thresholds['high'])] = 4
-    classified[risk_array > thresholds['high']] = 5
+    # Class upper bounds; class k covers (bins[k-2], bins[k-1]], class 5 is above 'high'
+    # Float rasters compare in their own precision, integer rasters against float64 bins
+    bins = np.array([
+        thresholds['very_low'],
+        thresholds['low'],
+        thresholds['moderate'],
+        thresholds['high']
+    ], dtype=risk_array.dtype if np.issubdtype(risk_array.dtype, np.floating) else np.float64)
+    
+    # Single binary-search pass over the raster
+    # side='left' gives the bin with bins[k-1] < value <= bins[k] (inclusive upper bounds)
+    classified = np.searchsorted(bins, risk_array, side='left').astype(np.uint8)
+    classified += 1
+    
+    # NaN risk stays unclassified
+    if np.issubdtype(risk_array.dtype, np.floating):
+        classified[np.isnan(risk_array)] = 0
     
     return classified
 
@@ -4,6 +4,7 @@ GeoJSON utilities for multi-hazard system
 
 import json
 import geopandas as gpd
+import numpy as np
 from shapely.geometry import shape, mapping
 from shapely.ops import unary_union
 from typing import Dict, List
@@ -26,12 +27,34 @@ def write_geojson(geojson: dict, file_path: Path) -> None:
     logger.info(f"Saved GeoJSON to {file_path}")
 
 
+def utm_areas(features: List[dict]) -> np.ndarray:
+    """
+    Planar areas (m²) of GeoJSON features in UTM Zone 45N
+    
+    Only geometries are parsed; properties never enter a DataFrame.
+    
+    Args:
+        features: GeoJSON features in EPSG:4326
+    
+    Returns:
+        Array of areas, one per feature
+    """
+    geometries = gpd.GeoSeries(
+        [shape(f['geometry']) if f['geometry'] else None for f in features],
+        crs="EPSG:4326"
+    )
+    
+    # Reproject to UTM for accurate area calculation (assuming Nepal)
+    return geometries.to_crs("EPSG:32645").area.to_numpy()  # UTM Zone 45N for Pokhara
+
+
 def simplify_geojson(geojson: dict, tolerance: float = 0.0001) -> dict:
     """Simplify geometries in GeoJSON"""
     gdf = gpd.GeoDataFrame.from_features(geojson['features'])
     gdf['geometry'] = gdf['geometry'].simplify(tolerance)
     
-    return json.loads(gdf.to_json())
+    # Feature dicts straight from the frame, without a JSON encode/decode round trip
+    return {"type": "FeatureCollection", "features": list(gdf.iterfeatures())}
 
 
 def merge_polygons(geojson: dict, group_by: str = None) -> dict:
@@ -42,28 +65,17 @@ def merge_polygons(geojson: dict, group_by: str = None) -> dict:
         geojson: Input GeoJSON
         group_by: Property name to group by before merging
     """
-    gdf = gpd.GeoDataFrame.from_features(geojson['features'])
+    features = geojson['features']
     
-    if group_by and group_by in gdf.columns:
-        merged_features = []
-        for group_value in gdf[group_by].unique():
-            group_gdf = gdf[gdf[group_by] == group_value]
-            merged_geom = unary_union(group_gdf.geometry)
-            
-            feature = {
-                "type": "Feature",
-                "geometry": mapping(merged_geom),
-                "properties": {group_by: group_value}
-            }
-            merged_features.append(feature)
-        
-        return {
-            "type": "FeatureCollection",
-            "features": merged_features
-        }
+    if group_by and any(group_by in (f['properties'] or {}) for f in features):
+        # Only the group column is loaded; one GEOS union per group inside
+        # dissolve, groups kept in first-seen order
+        gdf = gpd.GeoDataFrame.from_features(features, columns=['geometry', group_by])
+        merged = gdf.dissolve(by=group_by, sort=False).reset_index()
+        return {"type": "FeatureCollection", "features": list(merged.iterfeatures(drop_id=True))}
     else:
         # Merge all
-        merged_geom = unary_union(gdf.geometry)
+        merged_geom = unary_union([shape(f['geometry']) for f in features if f['geometry']])
         return {
             "type": "FeatureCollection",
             "features": [{
@@ -82,22 +94,18 @@ def calculate_area(geojson: dict, unit: str = 'm2') -> dict:
         geojson: Input GeoJSON
         unit: Area unit ('m2', 'km2', 'ha')
     """
-    gdf = gpd.GeoDataFrame.from_features(geojson['features'], crs="EPSG:4326")
-    
-    # Reproject to UTM for accurate area calculation (assuming Nepal)
-    gdf_utm = gdf.to_crs("EPSG:32645")  # UTM Zone 45N for Pokhara
-    
-    areas = gdf_utm.geometry.area
+    areas = utm_areas(geojson['features'])
     
     if unit == 'km2':
         areas = areas / 1_000_000
     elif unit == 'ha':
         areas = areas / 10_000
     
-    features = json.loads(gdf.to_json())['features']
-    for i, feature in enumerate(features):
-        feature['properties']['area'] = float(areas.iloc[i])
-        feature['properties']['area_unit'] = unit
+    # Input features with area properties added; geometries are reused as-is
+    features = [
+        {**feature, 'properties': {**feature['properties'], 'area': float(area), 'area_unit': unit}}
+        for feature, area in zip(geojson['features'], areas)
+    ]
     
     return {
         "type": "FeatureCollection",
@@ -107,17 +115,17 @@ def calculate_area(geojson: dict, unit: str = 'm2') -> dict:
 
 def filter_by_area(geojson: dict, min_area: float) -> dict:
     """Remove features smaller than minimum area (in m²)"""
-    filtered_features = []
+    features = geojson['features']
     
-    for feature in geojson['features']:
-        geom = shape(feature['geometry'])
-        # Simple area filter (not accurate for lat/lon, but fast)
-        if geom.area * 111000 * 111000 > min_area:  # Rough conversion
-            filtered_features.append(feature)
+    if not features:
+        return {"type": "FeatureCollection", "features": []}
+    
+    # Areas for all features in one vectorized reprojection, as in calculate_area
+    areas = utm_areas(features)
     
     return {
         "type": "FeatureCollection",
-        "features": filtered_features
+        "features": [feature for feature, area in zip(features, areas) if area > min_area]
     }
 
 
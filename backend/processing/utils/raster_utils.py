@@ -3,19 +3,199 @@ Raster processing utilities for multi-hazard system
 Handles DEM derivatives, raster-to-GeoJSON conversion, and visualization
 """
 
+import os
 import numpy as np
 import rasterio
+import geopandas as gpd
 from rasterio.features import shapes
-from rasterio.warp import calculate_default_transform, reproject, Resampling
+from rasterio.warp import calculate_default_transform, Resampling
 from rasterio.io import MemoryFile
-from scipy.ndimage import sobel
+from rasterio.windows import Window
+from rasterio.vrt import WarpedVRT
+import rasterio.shutil
+from scipy.ndimage import correlate
 import json
+import math
+import tempfile
 from typing import Dict, List, Tuple, Optional
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from contextlib import nullcontext
 import logging
+import sys
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from config import GEOJSON_PRECISION, RASTER_CONFIG
 
 logger = logging.getLogger(__name__)
 
+try:
+    import pyogrio.raw as pyogrio_raw
+    PYOGRIO_AVAILABLE = True
+except ImportError:
+    PYOGRIO_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    logger.debug("orjson not available, using stdlib json for GeoJSON export")
+
+try:
+    import geobuf
+    from geobuf import geobuf_pb2
+    GEOBUF_AVAILABLE = True
+except ImportError:
+    GEOBUF_AVAILABLE = False
+    logger.info("geobuf not available, .pbf layer downloads will not be generated")
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.debug("Numba not available, computing terrain derivatives with SciPy kernels")
+
+try:
+    import numexpr as ne
+    ne.set_num_threads(os.cpu_count() or 1)
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    NUMEXPR_AVAILABLE = False
+    logger.debug("numexpr not available, using NumPy for weighted raster sums")
+
+try:
+    import cupy as cp
+    from cupyx.scipy.ndimage import sobel as cp_sobel
+    CUPY_AVAILABLE = cp.cuda.runtime.getDeviceCount() > 0
+except (ImportError, RuntimeError):
+    CUPY_AVAILABLE = False
+    logger.debug("CuPy/CUDA device not available, computing terrain derivatives on CPU")
+
+# 3x3 Sobel (Horn) gradient kernels, oriented like scipy.ndimage.sobel
+SOBEL_X = np.array([[-1, 0, 1], [-2, 0, 2], [-1, 0, 1]], dtype=np.float32)
+SOBEL_Y = np.ascontiguousarray(SOBEL_X.T)
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True)
+    def _terrain_kernel(dem, kx, out_slope, out_aspect, out_curv, cell_size):
+        """Slope, aspect and curvature from one set of gradients, parallel over rows"""
+        h, w = dem.shape
+        slope_scale = 1.0 / (8 * cell_size)
+        curv_scale = 1.0 / (cell_size * cell_size)
+        
+        # Sobel gradients; for a 3x3 kernel clamping the edges is mode='reflect'
+        gx = np.empty((h, w), dtype=np.float32)
+        gy = np.empty((h, w), dtype=np.float32)
+        for i in prange(h):
+            for j in range(w):
+                sx = 0.0
+                sy = 0.0
+                for di in range(3):
+                    ii = min(max(i + di - 1, 0), h - 1)
+                    for dj in range(3):
+                        jj = min(max(j + dj - 1, 0), w - 1)
+                        v = dem[ii, jj]
+                        sx += kx[di, dj] * v
+                        sy += kx[dj, di] * v
+                gx[i, j] = sx
+                gy[i, j] = sy
+        
+        for i in prange(h):
+            for j in range(w):
+                out_slope[i, j] = math.degrees(math.atan(math.sqrt(gx[i, j] ** 2 + gy[i, j] ** 2) * slope_scale))
+                
+                aspect = 90.0 - math.degrees(math.atan2(-gy[i, j], gx[i, j]))
+                if aspect < 0:
+                    aspect += 360.0
+                out_aspect[i, j] = aspect
+                
+                # Second derivatives: Sobel of the gradients, edges reflected as above
+                curv = 0.0
+                for di in range(3):
+                    ii = min(max(i + di - 1, 0), h - 1)
+                    for dj in range(3):
+                        jj = min(max(j + dj - 1, 0), w - 1)
+                        curv += kx[di, dj] * gx[ii, jj] + kx[dj, di] * gy[ii, jj]
+                out_curv[i, j] = curv * curv_scale
+
+
+def _sobel_gradients(dem_array: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sobel x/y gradients of a DEM in float32, one kernel pass each"""
+    dem = dem_array.astype(np.float32, copy=False)
+    gx = correlate(dem, SOBEL_X, mode='reflect')
+    gy = correlate(dem, SOBEL_Y, mode='reflect')
+    return gx, gy
+
+
+def _slope_from_gradients(
+    gx: np.ndarray,
+    gy: np.ndarray,
+    cell_size: float,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Slope in degrees from raw Sobel gradients, optionally written into out"""
+    slope = np.hypot(gx, gy, out=out)
+    slope /= 8 * cell_size
+    np.arctan(slope, out=slope)
+    return np.degrees(slope, out=slope)
+
+
+def _aspect_from_gradients(gx: np.ndarray, gy: np.ndarray) -> np.ndarray:
+    """Aspect in degrees (0 = North, clockwise) from raw Sobel gradients"""
+    aspect = np.arctan2(-gy, gx)
+    np.degrees(aspect, out=aspect)
+    np.subtract(90, aspect, out=aspect)
+    aspect[aspect < 0] += 360
+    return aspect
+
+
+def _curvature_from_gradients(gx: np.ndarray, gy: np.ndarray, cell_size: float) -> np.ndarray:
+    """Curvature (dxx + dyy) from raw Sobel gradients by a second Sobel pass"""
+    curvature = correlate(gx, SOBEL_X, mode='reflect')
+    curvature += correlate(gy, SOBEL_Y, mode='reflect')
+    curvature /= cell_size ** 2
+    return curvature
+
+
+def calculate_terrain_derivatives(
+    dem_array: np.ndarray,
+    cell_size: float = 30
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculate slope, aspect and curvature sharing one pair of gradients
+    
+    Results match calculate_slope, calculate_aspect and calculate_curvature.
+    With Numba the gradients and the three outputs take two parallel passes.
+    
+    Args:
+        dem_array: Digital Elevation Model as 2D array
+        cell_size: Pixel size in meters
+    
+    Returns:
+        Tuple of (slope, aspect, curvature) float32 arrays
+    """
+    if NUMBA_AVAILABLE:
+        dem = np.ascontiguousarray(dem_array, dtype=np.float32)
+        slope = np.empty(dem.shape, dtype=np.float32)
+        aspect = np.empty(dem.shape, dtype=np.float32)
+        curvature = np.empty(dem.shape, dtype=np.float32)
+        _terrain_kernel(dem, SOBEL_X, slope, aspect, curvature, float(cell_size))
+        return slope, aspect, curvature
+    
+    dem_array = dem_array.astype(np.float32, copy=False)
+    gx, gy = _sobel_gradients(dem_array)
+    
+    # Curvature and aspect first so slope can overwrite gx in place
+    curvature = _curvature_from_gradients(gx, gy, cell_size)
+    aspect = _aspect_from_gradients(gx, gy)
+    slope = _slope_from_gradients(gx, gy, cell_size, out=gx)
+    del gy
+    
+    return slope, aspect, curvature
+
 
 def calculate_slope(dem_array: np.ndarray, cell_size: float = 30) -> np.ndarray:
     """
@@ -28,15 +208,10 @@ def calculate_slope(dem_array: np.ndarray, cell_size: float = 30) -> np.ndarray:
     Returns:
         Slope array in degrees
     """
-    # Calculate gradients using Sobel filters
-    dx = sobel(dem_array, axis=1) / (8 * cell_size)
-    dy = sobel(dem_array, axis=0) / (8 * cell_size)
-    
-    # Calculate slope in radians then convert to degrees
-    slope_rad = np.arctan(np.sqrt(dx**2 + dy**2))
-    slope_deg = np.degrees(slope_rad)
+    # Calculate gradients using Sobel kernels
+    gx, gy = _sobel_gradients(dem_array)
     
-    return slope_deg.astype(np.float32)
+    return _slope_from_gradients(gx, gy, cell_size)
 
 
 def calculate_aspect(dem_array: np.ndarray) -> np.ndarray:
@@ -49,17 +224,9 @@ def calculate_aspect(dem_array: np.ndarray) -> np.ndarray:
     Returns:
         Aspect array in degrees (0-360)
     """
-    dx = sobel(dem_array, axis=1)
-    dy = sobel(dem_array, axis=0)
-    
-    aspect_rad = np.arctan2(-dy, dx)
-    aspect_deg = np.degrees(aspect_rad)
+    gx, gy = _sobel_gradients(dem_array)
     
-    # Convert to 0-360 range (0 = North, clockwise)
-    aspect_deg = 90 - aspect_deg
-    aspect_deg = np.where(aspect_deg < 0, aspect_deg + 360, aspect_deg)
-    
-    return aspect_deg.astype(np.float32)
+    return _aspect_from_gradients(gx, gy)
 
 
 def calculate_curvature(dem_array: np.ndarray, cell_size: float = 30) -> np.ndarray:
@@ -73,65 +240,258 @@ def calculate_curvature(dem_array: np.ndarray, cell_size: float = 30) -> np.ndar
     Returns:
         Curvature array
     """
-    # Second derivatives
-    dxx = sobel(sobel(dem_array, axis=1), axis=1) / (cell_size ** 2)
-    dyy = sobel(sobel(dem_array, axis=0), axis=0) / (cell_size ** 2)
+    # Second derivatives (dxx + dyy), Sobel applied to the gradients
+    gx, gy = _sobel_gradients(dem_array)
     
     # Plan curvature approximation
-    curvature = dxx + dyy
+    return _curvature_from_gradients(gx, gy, cell_size)
+
+
+def calculate_terrain_derivatives_gpu(
+    dem_array: np.ndarray,
+    cell_size: float = 30
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculate slope, aspect and curvature on the GPU in one pass
+    
+    The DEM is copied to the device once and the Sobel gradients are shared
+    between the three derivatives. Results match calculate_slope,
+    calculate_aspect and calculate_curvature.
+    
+    Args:
+        dem_array: Digital Elevation Model as 2D array
+        cell_size: Pixel size in meters
+    
+    Returns:
+        Tuple of (slope, aspect, curvature) float32 arrays
+    """
+    dem = cp.asarray(dem_array)
+    
+    gx = cp_sobel(dem, axis=1)
+    gy = cp_sobel(dem, axis=0)
+    
+    # Slope in degrees
+    dx = gx / (8 * cell_size)
+    dy = gy / (8 * cell_size)
+    slope = cp.degrees(cp.arctan(cp.sqrt(dx**2 + dy**2)))
+    del dx, dy
+    
+    # Aspect in degrees (0 = North, clockwise)
+    aspect = 90 - cp.degrees(cp.arctan2(-gy, gx))
+    aspect = cp.where(aspect < 0, aspect + 360, aspect)
+    
+    # Plan curvature from second derivatives
+    curvature = (cp_sobel(gx, axis=1) + cp_sobel(gy, axis=0)) / (cell_size ** 2)
+    
+    return tuple(cp.asnumpy(a.astype(cp.float32)) for a in (slope, aspect, curvature))
+
+
+def round_geometry(geom: dict, precision: int = GEOJSON_PRECISION, as_lists: bool = True) -> dict:
+    """
+    Round polygon coordinates of a GeoJSON geometry
+    
+    Args:
+        geom: GeoJSON Polygon geometry as produced by rasterio shapes
+        precision: Number of decimal places to keep
+        as_lists: Convert rings back to nested lists; otherwise keep them as
+            (n, 2) arrays for serializers that accept NumPy input
+    
+    Returns:
+        Geometry with rounded coordinates
+    """
+    rings = [np.round(np.asarray(ring), precision) for ring in geom['coordinates']]
+    geom['coordinates'] = [ring.tolist() for ring in rings] if as_lists else rings
+    return geom
+
+
+def _dump_feature(feature: dict) -> bytes:
+    """Serialize a GeoJSON feature, with orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(feature, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(feature).encode()
+
+
+class _GeobufWriter:
+    """
+    Write a Geobuf FeatureCollection one feature at a time
+    
+    Each feature is serialized as its own Data message; protobuf merges
+    concatenated messages, so the file decodes as a single collection.
+    """
+    
+    def __init__(self, path: Path, precision: int = GEOJSON_PRECISION):
+        self.encoder = geobuf.Encoder()
+        self.encoder.precision = precision
+        self.encoder.e = 10 ** precision
+        self.file = open(path, 'wb')
+        
+        header = geobuf_pb2.Data(dimensions=2, precision=precision)
+        header.feature_collection.SetInParent()
+        self.file.write(header.SerializeToString())
+    
+    def write(self, feature: dict) -> None:
+        # Property keys new to this feature are appended to the merged key list
+        chunk = self.encoder.data = geobuf_pb2.Data()
+        self.encoder.encode_feature(chunk.feature_collection.features.add(), feature)
+        self.file.write(chunk.SerializeToString())
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.file.close()
+
+
+def write_flatgeobuf_sibling(geojson_path: Path, crs=None) -> Optional[Path]:
+    """
+    Write a compact FlatGeobuf (.fgb) copy next to a GeoJSON
+    
+    Empty layers get an empty .fgb so every layer has a download.
+    
+    Args:
+        geojson_path: Path of the GeoJSON the copy belongs to
+        crs: CRS of the geometries
     
-    return curvature.astype(np.float32)
+    Returns:
+        Path of the written file, or None if it could not be written
+    """
+    fgb_path = Path(geojson_path).with_suffix('.fgb')
+    try:
+        if PYOGRIO_AVAILABLE:
+            # WKB arrays straight from GDAL, no per-feature Python objects
+            meta, _, geometry, field_data = pyogrio_raw.read(geojson_path)
+            
+            # An empty collection has no geometry type; traced rasters are polygons
+            geometry_type = meta['geometry_type']
+            if geometry_type == 'Unknown':
+                geometry_type = 'Polygon'
+            
+            pyogrio_raw.write(
+                fgb_path, geometry, field_data, meta['fields'],
+                driver='FlatGeobuf',
+                geometry_type=geometry_type,
+                crs=crs.to_wkt() if crs is not None else meta['crs']
+            )
+        else:
+            gdf = gpd.read_file(geojson_path)
+            schema = {'geometry': 'Polygon', 'properties': {}} if gdf.empty else None
+            gdf.set_crs(crs, allow_override=True).to_file(fgb_path, driver='FlatGeobuf', schema=schema)
+    except Exception as e:
+        logger.warning(f"Could not write FlatGeobuf {fgb_path}: {e}")
+        return None
+    
+    return fgb_path
 
 
 def raster_to_geojson(
     raster_path: Path,
     output_path: Path,
     class_names: Optional[Dict[int, str]] = None,
-    simplify_tolerance: float = 0.0001
-) -> dict:
+    simplify_tolerance: float = 0.0001,
+    precision: int = GEOJSON_PRECISION
+) -> int:
     """
     Convert classified raster to GeoJSON polygons
     
+    Polygons are written to the FeatureCollection one at a time as they are
+    traced, so the feature list is never held in memory.
+    
     Args:
         raster_path: Path to input raster
         output_path: Path to output GeoJSON
         class_names: Mapping of pixel values to class names
         simplify_tolerance: Geometry simplification tolerance
+        precision: Decimal places kept in coordinates
     
     Returns:
-        GeoJSON FeatureCollection as dict
+        Number of features written
     """
     logger.info(f"Converting raster {raster_path} to GeoJSON")
     
-    with rasterio.open(raster_path) as src:
-        image = src.read(1)
-        mask = image != src.nodata
+    n_features = 0
+    
+    # Geobuf (.pbf) download copy, encoded from the same stream of features
+    pbf_writer = _GeobufWriter(Path(output_path).with_suffix('.pbf'), precision) if GEOBUF_AVAILABLE else nullcontext()
+    
+    with rasterio.open(raster_path) as src, open(output_path, 'wb') as f, pbf_writer as pbf:
+        image = np.ascontiguousarray(src.read(1))
+        crs = src.crs
         
-        features = []
-        for geom, value in shapes(image, mask=mask, transform=src.transform):
+        if src.nodata == 0 and np.issubdtype(image.dtype, np.integer):
+            # Class rasters use 0 as nodata: the mask is just the nonzero pixels
+            mask = image.astype(bool)
+        else:
+            mask = image != src.nodata
+        
+        f.write(b'{"type": "FeatureCollection", "features": [')
+        
+        for geom, value in shapes(image, mask=mask, connectivity=4, transform=src.transform):
             value = int(value)
             
             feature = {
                 "type": "Feature",
-                "geometry": geom,
+                "geometry": round_geometry(geom, precision, as_lists=not ORJSON_AVAILABLE),
                 "properties": {
                     "value": value,
                     "class": class_names.get(value, f"Class_{value}") if class_names else f"Class_{value}"
                 }
             }
-            features.append(feature)
+            
+            if n_features:
+                f.write(b', ')
+            f.write(_dump_feature(feature))
+            if pbf is not None:
+                pbf.write(feature)
+            n_features += 1
+        
+        f.write(b']}')
     
-    geojson = {
-        "type": "FeatureCollection",
-        "features": features
-    }
+    # Compact FlatGeobuf download
+    write_flatgeobuf_sibling(output_path, crs)
+    
+    logger.info(f"Created GeoJSON with {n_features} features")
+    return n_features
+
+
+@lru_cache(maxsize=32)
+def _compile_thresholds(
+    threshold_items: Tuple[Tuple[str, float], ...],
+    class_value_items: Optional[Tuple[Tuple[str, int], ...]],
+    dtype: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Turn a threshold scheme into sorted bins and a class lookup table
+    
+    Cached so repeated classification (e.g. per window) skips the sorting.
+    
+    Args:
+        threshold_items: (class_name, threshold) pairs
+        class_value_items: (class_name, pixel value) pairs, or None for
+            1-based values in class name order
+        dtype: Dtype of the bins
+    
+    Returns:
+        Tuple of (bins, lut), both read-only. Bin i covers (bins[i-1], bins[i]];
+        the extra last bin is everything above the highest threshold and maps
+        to the highest class.
+    """
+    if class_value_items is None:
+        class_values = {name: i+1 for i, (name, _) in enumerate(sorted(threshold_items))}
+    else:
+        class_values = dict(class_value_items)
+    
+    # Sort thresholds
+    sorted_thresholds = sorted(threshold_items, key=lambda x: x[1])
     
-    # Save to file
-    with open(output_path, 'w') as f:
-        json.dump(geojson, f)
+    bins = np.array([threshold for _, threshold in sorted_thresholds], dtype=dtype)
+    lut = np.array(
+        [class_values[class_name] for class_name, _ in sorted_thresholds] + [max(class_values.values())],
+        dtype=np.uint8
+    )
     
-    logger.info(f"Created GeoJSON with {len(features)} features")
-    return geojson
+    bins.setflags(write=False)
+    lut.setflags(write=False)
+    return bins, lut
 
 
 def classify_raster(
@@ -150,33 +510,106 @@ def classify_raster(
     Returns:
         Classified array with integer values
     """
-    if class_values is None:
-        class_values = {name: i+1 for i, name in enumerate(sorted(thresholds.keys()))}
+    if len(thresholds) == 0:
+        return np.zeros_like(continuous_array, dtype=np.uint8)
     
-    classified = np.zeros_like(continuous_array, dtype=np.uint8)
-    
-    # Sort thresholds
-    sorted_thresholds = sorted(thresholds.items(), key=lambda x: x[1])
+    is_float = np.issubdtype(continuous_array.dtype, np.floating)
+    bins, lut = _compile_thresholds(
+        tuple(thresholds.items()),
+        tuple(class_values.items()) if class_values is not None else None,
+        continuous_array.dtype.str if is_float else '<f8'
+    )
     
-    for i, (class_name, threshold) in enumerate(sorted_thresholds):
-        if i == 0:
-            mask = continuous_array <= threshold
-        else:
-            prev_threshold = sorted_thresholds[i-1][1]
-            mask = (continuous_array > prev_threshold) & (continuous_array <= threshold)
-        
-        classified[mask] = class_values[class_name]
+    # Single binary-search pass (side='left' keeps upper bounds inclusive),
+    # then bin index -> class value
+    classified = lut[np.searchsorted(bins, continuous_array, side='left')]
     
-    # Handle values above highest threshold
-    if len(sorted_thresholds) > 0:
-        highest_threshold = sorted_thresholds[-1][1]
-        # Find the "very_high" or highest class
-        max_class = max(class_values.values())
-        classified[continuous_array > highest_threshold] = max_class
+    # NaN values stay unclassified
+    if is_float:
+        classified[np.isnan(continuous_array)] = 0
     
     return classified
 
 
+def weighted_sum(
+    arrays: List[np.ndarray],
+    coefficients: List[float],
+    offset: float = 0.0,
+    out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Compute sum(coefficient * array) + offset in a single fused float32 pass
+    
+    Args:
+        arrays: Input rasters of identical shape
+        coefficients: Scalar multiplier for each raster
+        offset: Constant added to every pixel
+        out: Optional float32 buffer for the result; may be arrays[0] itself
+    
+    Returns:
+        Weighted sum as float32 array
+    """
+    arrays = [np.asarray(a).astype(np.float32, copy=False) for a in arrays]
+    coefficients = [np.float32(c) for c in coefficients]
+    
+    if NUMEXPR_AVAILABLE:
+        local_dict = {}
+        terms = []
+        for i, (array, coef) in enumerate(zip(arrays, coefficients)):
+            local_dict[f"a{i}"] = array
+            local_dict[f"c{i}"] = coef
+            terms.append(f"c{i} * a{i}")
+        if offset:
+            local_dict["offset"] = np.float32(offset)
+            terms.append("offset")
+        return ne.evaluate(" + ".join(terms), local_dict=local_dict, out=out)
+    
+    result = np.multiply(arrays[0], coefficients[0], out=out)
+    for array, coef in zip(arrays[1:], coefficients[1:]):
+        result += array * coef
+    if offset:
+        result += np.float32(offset)
+    return result
+
+
+# Fractional bits of the uint16 fixed-point weighted sum
+FIXED_POINT_BITS = 15
+
+
+def weighted_sum_uint8(
+    arrays: List[np.ndarray],
+    coefficients: List[float],
+    maxima: List[float]
+) -> Optional[np.ndarray]:
+    """
+    Compute sum(coefficient * array) for uint8 rasters in uint16 fixed point
+    
+    Args:
+        arrays: uint8 input rasters of identical shape
+        coefficients: Scalar multiplier for each raster
+        maxima: Maximum value of each raster
+    
+    Returns:
+        Weighted sum as float32 array, or None if the sum could overflow uint16
+    """
+    fixed = [int(round(c * (1 << FIXED_POINT_BITS))) for c in coefficients]
+    
+    # Fall back to floating point if weights are negative or the sum can overflow
+    if min(fixed) < 0 or sum(f * m for f, m in zip(fixed, maxima)) > np.iinfo(np.uint16).max:
+        return None
+    
+    acc = arrays[0].astype(np.uint16)
+    acc *= np.uint16(fixed[0])
+    for array, f in zip(arrays[1:], fixed[1:]):
+        term = array.astype(np.uint16)
+        term *= np.uint16(f)
+        acc += term
+    
+    result = acc.astype(np.float32)
+    result *= np.float32(1.0 / (1 << FIXED_POINT_BITS))
+    return result
+
+
 def save_cog(
     array: np.ndarray,
     output_path: Path,
@@ -186,6 +619,11 @@ def save_cog(
     """
     Save array as Cloud-Optimized GeoTIFF
     
+    The COG driver cannot be written directly, so rasterio would buffer the
+    whole raster in an in-memory dataset. Instead the array is streamed in
+    tile-aligned strips to a temporary tiled GeoTIFF next to the output and
+    converted from there, so a memmapped array is never fully resident.
+    
     Args:
         array: Input array
         output_path: Output path
@@ -195,21 +633,77 @@ def save_cog(
     profile.update({
         'count': 1,
         'dtype': array.dtype,
-        'compress': 'LZW',
-        'tiled': True,
-        'blockxsize': 256,
-        'blockysize': 256,
     })
     
     if nodata is not None:
         profile['nodata'] = nodata
     
-    with rasterio.open(output_path, 'w', **profile) as dst:
-        dst.write(array, 1)
+    # GTiff layout options do not apply to the COG driver
+    cog_profile = {
+        k: v for k, v in profile.items()
+        if k not in ('driver', 'tiled', 'blockxsize', 'blockysize', 'interleave', 'compress', 'photometric')
+    }
+    
+    block_size = 512
+    
+    # Uncompressed staging raster with the same tiling as the COG
+    staging_profile = dict(
+        cog_profile,
+        driver='GTiff',
+        tiled=True,
+        blockxsize=block_size,
+        blockysize=block_size,
+        BIGTIFF='IF_SAFER',
+    )
+    
+    with tempfile.TemporaryDirectory(dir=Path(output_path).parent) as tmp_dir:
+        staging_path = Path(tmp_dir) / "staging.tif"
+        
+        with rasterio.open(staging_path, 'w', **staging_profile) as dst:
+            for row_off in range(0, dst.height, block_size):
+                window = Window(0, row_off, dst.width, min(block_size, dst.height - row_off))
+                dst.write(array[row_off:row_off + window.height], 1, window=window)
+        
+        # GDAL's COG driver writes tiles, internal overviews and IFDs in COG order in one pass
+        rasterio.shutil.copy(
+            staging_path,
+            output_path,
+            driver='COG',
+            compress='DEFLATE',
+            predictor='YES',
+            blocksize=block_size,
+            overviews='AUTO',
+            overview_resampling='NEAREST',
+            num_threads='ALL_CPUS',
+        )
     
     logger.info(f"Saved raster to {output_path}")
 
 
+def build_colormap_lut(
+    colormap: Dict[str, str],
+    class_mapping: Dict[int, str]
+) -> np.ndarray:
+    """
+    Build a 256-entry RGB lookup table for uint8 classified rasters
+    
+    Args:
+        colormap: Dictionary mapping class names to hex colors
+        class_mapping: Dictionary mapping pixel values to class names
+    
+    Returns:
+        LUT array (256, 3) of uint8; index with a uint8 raster to get RGB
+    """
+    lut = np.zeros((256, 3), dtype=np.uint8)
+    
+    for value, class_name in class_mapping.items():
+        if class_name in colormap:
+            hex_color = colormap[class_name].lstrip('#')
+            lut[value] = [int(hex_color[i:i+2], 16) for i in (0, 2, 4)]
+    
+    return lut
+
+
 def apply_colormap(
     array: np.ndarray,
     colormap: Dict[str, str],
@@ -226,6 +720,12 @@ def apply_colormap(
     Returns:
         RGB array (height, width, 3)
     """
+    # Integer rasters within the palette range: one gather through a LUT
+    # instead of a comparison and masked write per class
+    if np.issubdtype(array.dtype, np.integer) and array.size:
+        if array.dtype == np.uint8 or (array.min() >= 0 and array.max() <= 255):
+            return build_colormap_lut(colormap, class_mapping)[array]
+    
     rgb = np.zeros((*array.shape, 3), dtype=np.uint8)
     
     for value, class_name in class_mapping.items():
@@ -248,13 +748,34 @@ def read_raster(file_path: Path) -> Tuple[np.ndarray, dict]:
     Returns:
         Tuple of (array, profile)
     """
-    with rasterio.open(file_path) as src:
-        array = src.read(1)
-        profile = src.profile.copy()
+    # Decode compressed blocks on all cores; for remote (/vsicurl/, s3://) COGs,
+    # skip directory listings and merge adjacent range requests
+    with rasterio.Env(
+        GDAL_NUM_THREADS=RASTER_CONFIG['read_threads'],
+        GDAL_DISABLE_READDIR_ON_OPEN='EMPTY_DIR',
+        GDAL_HTTP_MERGE_CONSECUTIVE_RANGES='YES',
+        GDAL_HTTP_MULTIPLEX='YES'
+    ):
+        with rasterio.open(file_path, num_threads=RASTER_CONFIG['read_threads']) as src:
+            array = src.read(1)
+            profile = src.profile.copy()
     
     return array, profile
 
 
+def _warp_to_reference(raster_path: Path, ref_profile: dict) -> np.ndarray:
+    """Read band 1 of a raster warped onto the reference grid"""
+    with rasterio.open(raster_path) as src, WarpedVRT(
+        src,
+        crs=ref_profile['crs'],
+        transform=ref_profile['transform'],
+        width=ref_profile['width'],
+        height=ref_profile['height'],
+        resampling=Resampling.bilinear
+    ) as vrt:
+        return vrt.read(1)
+
+
 def align_rasters(
     rasters: List[Path],
     reference_idx: int = 0
@@ -262,36 +783,25 @@ def align_rasters(
     """
     Align multiple rasters to same extent and resolution
     
+    Rasters are warped concurrently; each thread opens its own dataset and
+    GDAL releases the GIL while warping.
+    
     Args:
         rasters: List of raster file paths
         reference_idx: Index of reference raster for alignment
     
     Returns:
-        List of (array, profile) tuples
+        List of (array, profile) tuples, reference first
     """
     # Read reference
     ref_array, ref_profile = read_raster(rasters[reference_idx])
     aligned = [(ref_array, ref_profile)]
     
     # Align others to reference
-    for i, raster_path in enumerate(rasters):
-        if i == reference_idx:
-            continue
-        
-        with rasterio.open(raster_path) as src:
-            # Create output array with reference shape
-            aligned_array = np.empty(ref_array.shape, dtype=src.dtypes[0])
-            
-            reproject(
-                source=rasterio.band(src, 1),
-                destination=aligned_array,
-                src_transform=src.transform,
-                src_crs=src.crs,
-                dst_transform=ref_profile['transform'],
-                dst_crs=ref_profile['crs'],
-                resampling=Resampling.bilinear
-            )
-            
+    others = [path for i, path in enumerate(rasters) if i != reference_idx]
+    
+    with ThreadPoolExecutor(max_workers=max(1, len(others))) as executor:
+        for aligned_array in executor.map(lambda path: _warp_to_reference(path, ref_profile), others):
             aligned.append((aligned_array, ref_profile))
     
     return aligned
@@ -0,0 +1,226 @@
+"""
+Background workers for hazard processing pipelines
+Runs CPU-heavy pipelines on Dramatiq workers with a Redis broker
+
+Start workers from the repository root with:
+    dramatiq workers --path backend
+"""
+
+import json
+import uuid
+import asyncio
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Callable
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from config import WORKER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+try:
+    import dramatiq
+    import redis
+    from dramatiq.brokers.redis import RedisBroker
+    DRAMATIQ_AVAILABLE = True
+except ImportError:
+    DRAMATIQ_AVAILABLE = False
+    logger.info("Dramatiq/Redis not available, hazard jobs will run inline")
+
+# Process pool for pipelines the API runs inline, started with the app
+_compute_pool: Optional[ProcessPoolExecutor] = None
+
+# Whether the Redis broker answered at startup; hazard jobs run inline otherwise
+_queue_available = False
+
+
+def start_compute_pool() -> None:
+    """Start the process pool that runs inline pipelines off the API process"""
+    global _compute_pool
+    
+    if _compute_pool is None:
+        # Spawn avoids forking the threaded server process (GDAL, event loop)
+        _compute_pool = ProcessPoolExecutor(
+            max_workers=WORKER_CONFIG['compute_workers'],
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Started compute pool with {WORKER_CONFIG['compute_workers']} processes")
+
+
+def shutdown_compute_pool() -> None:
+    """Stop the compute pool, cancelling pipelines that have not started"""
+    global _compute_pool
+    
+    if _compute_pool is not None:
+        _compute_pool.shutdown(wait=False, cancel_futures=True)
+        _compute_pool = None
+
+
+async def run_in_compute_pool(func: Callable, **kwargs):
+    """
+    Run a pipeline in the compute pool without blocking the event loop
+    
+    Falls back to a worker thread when the pool has not been started.
+    
+    Args:
+        func: Picklable module-level pipeline function
+        **kwargs: Pipeline keyword arguments
+    
+    Returns:
+        Pipeline result
+    """
+    if _compute_pool is None:
+        return await run_in_threadpool(func, **kwargs)
+    
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_compute_pool, functools.partial(func, **kwargs))
+
+
+def serialize_outputs(outputs: Dict) -> Dict[str, str]:
+    """Convert pipeline outputs (Paths, statistics) to strings"""
+    return {k: str(v) for k, v in outputs.items()}
+
+
+if DRAMATIQ_AVAILABLE:
+    broker = RedisBroker(url=WORKER_CONFIG['redis_url'])
+    dramatiq.set_broker(broker)
+    
+    job_store = redis.Redis.from_url(
+        WORKER_CONFIG['redis_url'],
+        decode_responses=True,
+        socket_connect_timeout=WORKER_CONFIG['connect_timeout']
+    )
+    
+    def _job_key(job_id: str) -> str:
+        return f"hazard:job:{job_id}"
+    
+    def _set_job_state(job_id: str, **fields) -> None:
+        key = _job_key(job_id)
+        job_store.hset(key, mapping=fields)
+        job_store.expire(key, WORKER_CONFIG['job_ttl'])
+    
+    def _run_job(job_id: str, pipeline: Callable, kwargs: Dict) -> None:
+        """Run a pipeline and record its state in Redis"""
+        _set_job_state(job_id, status="running")
+        
+        # All string arguments of the pipelines are filesystem paths
+        kwargs = {k: Path(v) if isinstance(v, str) else v for k, v in kwargs.items()}
+        
+        try:
+            outputs = pipeline(**kwargs)
+        except Exception as e:
+            logger.error(f"Hazard job {job_id} failed: {e}", exc_info=True)
+            _set_job_state(job_id, status="failed", error=str(e))
+            raise
+        
+        _set_job_state(
+            job_id,
+            status="success",
+            outputs=json.dumps(serialize_outputs(outputs))
+        )
+    
+    @dramatiq.actor(max_retries=0, time_limit=WORKER_CONFIG['time_limit_ms'])
+    def landslide_job(job_id: str, kwargs: Dict) -> None:
+        from processing.landslide.pipeline import run_landslide_pipeline
+        _run_job(job_id, run_landslide_pipeline, kwargs)
+    
+    @dramatiq.actor(max_retries=0, time_limit=WORKER_CONFIG['time_limit_ms'])
+    def flood_job(job_id: str, kwargs: Dict) -> None:
+        from processing.flood.pipeline import run_flood_pipeline
+        _run_job(job_id, run_flood_pipeline, kwargs)
+    
+    @dramatiq.actor(max_retries=0, time_limit=WORKER_CONFIG['time_limit_ms'])
+    def exposure_job(job_id: str, kwargs: Dict) -> None:
+        from processing.exposure.pipeline import run_exposure_pipeline
+        _run_job(job_id, run_exposure_pipeline, kwargs)
+    
+    @dramatiq.actor(max_retries=0, time_limit=WORKER_CONFIG['time_limit_ms'])
+    def multi_hazard_job(job_id: str, kwargs: Dict) -> None:
+        from processing.multi_hazard import run_multi_hazard_integration
+        _run_job(job_id, run_multi_hazard_integration, kwargs)
+    
+    JOB_ACTORS = {
+        "landslide": landslide_job,
+        "flood": flood_job,
+        "exposure": exposure_job,
+        "multi_hazard": multi_hazard_job,
+    }
+
+
+def check_task_queue() -> bool:
+    """
+    Ping the Redis broker and cache whether hazard jobs can be queued
+    
+    Returns:
+        True if jobs will be queued on workers, False if they run inline
+    """
+    global _queue_available
+    
+    _queue_available = False
+    if DRAMATIQ_AVAILABLE:
+        try:
+            _queue_available = bool(job_store.ping())
+        except redis.RedisError as e:
+            logger.info(f"Task queue at {WORKER_CONFIG['redis_url']} not reachable ({e}), hazard jobs will run inline")
+    
+    if _queue_available:
+        logger.info(f"Queueing hazard jobs on {WORKER_CONFIG['redis_url']}")
+    
+    return _queue_available
+
+
+def task_queue_available() -> bool:
+    """Whether the task queue answered the startup ping"""
+    return _queue_available
+
+
+def submit_job(pipeline: str, kwargs: Dict) -> str:
+    """
+    Queue a hazard pipeline for background execution
+    
+    Args:
+        pipeline: One of "landslide", "flood", "exposure", "multi_hazard"
+        kwargs: Pipeline keyword arguments (Paths are sent as strings)
+    
+    Returns:
+        Job ID
+    """
+    if not _queue_available:
+        raise RuntimeError("Task queue not available")
+    
+    job_id = uuid.uuid4().hex
+    kwargs = {k: str(v) if isinstance(v, Path) else v for k, v in kwargs.items()}
+    
+    _set_job_state(job_id, status="queued", pipeline=pipeline)
+    JOB_ACTORS[pipeline].send_with_options(kwargs={"job_id": job_id, "kwargs": kwargs})
+    
+    logger.info(f"Queued {pipeline} job {job_id}")
+    
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    """
+    Look up job state
+    
+    Args:
+        job_id: Job ID returned by submit_job
+    
+    Returns:
+        Dictionary with status, outputs and error, or None if unknown
+    """
+    if not _queue_available:
+        return None
+    
+    state = job_store.hgetall(_job_key(job_id))
+    if not state:
+        return None
+    
+    if 'outputs' in state:
+        state['outputs'] = json.loads(state['outputs'])
+    
+    return state
@@ -7,8 +7,22 @@ import numpy as np
 import rasterio
 from rasterio.transform import from_bounds
 import geopandas as gpd
-from shapely.geometry import Point, Polygon
-import json
+import pyogrio
+import shapely
+import logging
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Progress goes through logging; value-range scans only run when INFO is enabled
+logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stdout)
+logging.getLogger('pyogrio').setLevel(logging.WARNING)
+logger = logging.getLogger(__name__)
 
 # Pokhara region bounds (approximate)
 POKHARA_BOUNDS = {
@@ -22,6 +36,9 @@ POKHARA_BOUNDS = {
 WIDTH = 500
 HEIGHT = 500
 
+# Single seeded PCG64 stream for all random draws
+rng = np.random.default_rng(42)
+
 # Create transform
 transform = from_bounds(
     POKHARA_BOUNDS['west'],
@@ -41,186 +58,260 @@ profile = {
     'count': 1,
     'crs': 'EPSG:4326',
     'transform': transform,
-    'nodata': -9999
+    'nodata': -9999,
+    'tiled': True,
+    'blockxsize': 256,
+    'blockysize': 256,
+    'compress': 'zstd',
+    'zstd_level': 3,
+    'predictor': 3,  # Floating-point predictor for DEM/rainfall/SAR
+    'interleave': 'band',
+    'num_threads': 1  # Rasters are written concurrently, one GDAL thread each
 }
 
-print("Generating sample geospatial data for Pokhara...")
-
-# 1. Generate DEM (Digital Elevation Model)
-print("\n1. Creating DEM...")
-# Create realistic elevation pattern (higher in north, lower in south)
-x = np.linspace(0, 1, WIDTH)
-y = np.linspace(0, 1, HEIGHT)
-X, Y = np.meshgrid(x, y)
-
-# Base elevation with gradient
-dem = 800 + 1200 * Y  # 800m to 2000m elevation
-
-# Add some terrain features
-dem += 200 * np.sin(X * 4 * np.pi) * np.cos(Y * 3 * np.pi)
-dem += 150 * np.random.randn(HEIGHT, WIDTH)  # Add noise
 
-# Add a valley
-valley_mask = (X > 0.4) & (X < 0.6) & (Y > 0.3) & (Y < 0.7)
-dem[valley_mask] -= 300
+def write_tiled(path, array, raster_profile):
+    """Write a single-band raster one whole tile at a time"""
+    with rasterio.Env(GDAL_CACHEMAX=512, GDAL_DISABLE_READDIR_ON_OPEN='TRUE'):
+        with rasterio.open(path, 'w', **raster_profile) as dst:
+            for _, window in dst.block_windows(1):
+                rows, cols = window.toslices()
+                dst.write(array[rows, cols], 1, window=window)
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def build_layers(dem, landcover, rainfall, sar, noise):
+        """
+        Synthesize DEM, landcover, rainfall and SAR in one sweep, parallel over rows
+        
+        Returns:
+            Min/max of DEM, rainfall and SAR, reduced during the same pass
+        """
+        height, width = dem.shape
+        dem_min, rainfall_min, sar_min = np.inf, np.inf, np.inf
+        dem_max, rainfall_max, sar_max = -np.inf, -np.inf, -np.inf
+        
+        # Terrain term is separable: one sin per column, one cos per row
+        sin_x = np.empty(width)
+        for j in range(width):
+            sin_x[j] = np.sin(j / (width - 1) * 4 * np.pi)
+        
+        for i in prange(height):
+            y = i / (height - 1)
+            cos_y = np.cos(y * 3 * np.pi)
+            for j in range(width):
+                x = j / (width - 1)
+                
+                # Elevation: gradient, terrain features, noise and a valley
+                elevation = 800 + 1200 * y + 200 * sin_x[j] * cos_y + 150 * noise[0, i, j]
+                if 0.4 < x < 0.6 and 0.3 < y < 0.7:
+                    elevation -= 300
+                dem[i, j] = elevation
+                dem_min = min(dem_min, dem[i, j])
+                dem_max = max(dem_max, dem[i, j])
+                
+                # Landcover, later classes taking precedence as in the NumPy path
+                lc = 1
+                if elevation < 1200:
+                    lc = 2
+                if 0.35 < x < 0.65 and 0.2 < y < 0.5 and elevation < 1000:
+                    lc = 3
+                if 0.45 < x < 0.55 and 0.6 < y < 0.75 and elevation < 850:
+                    lc = 4
+                if elevation > 1800:
+                    lc = 5
+                landcover[i, j] = lc
+                
+                rainfall[i, j] = max(1500 + 500 * y + 200 * noise[1, i, j], 1000)
+                rainfall_min = min(rainfall_min, rainfall[i, j])
+                rainfall_max = max(rainfall_max, rainfall[i, j])
+                
+                # Backscatter: land, water bodies, then flooded low ground
+                backscatter = -8 + 3 * noise[2, i, j]
+                if lc == 4:
+                    backscatter = -22 + 2 * noise[3, i, j]
+                if elevation < 900 and y < 0.4:
+                    backscatter = -20 + 3 * noise[4, i, j]
+                sar[i, j] = backscatter
+                sar_min = min(sar_min, sar[i, j])
+                sar_max = max(sar_max, sar[i, j])
+        
+        return dem_min, dem_max, rainfall_min, rainfall_max, sar_min, sar_max
+
+
+logger.info("Generating sample geospatial data for Pokhara...")
+
+# The four rasters are independent files; GDAL releases the GIL while writing,
+# so writes overlap with each other and with generating the next layer
+raster_writer = ThreadPoolExecutor(max_workers=4)
+raster_writes = []
+
+if NUMBA_AVAILABLE:
+    # One noise draw for all layers, then a single parallel pass
+    dem = np.empty((HEIGHT, WIDTH), dtype=np.float32)
+    landcover = np.empty((HEIGHT, WIDTH), dtype=np.uint8)
+    rainfall = np.empty((HEIGHT, WIDTH), dtype=np.float32)
+    sar = np.empty((HEIGHT, WIDTH), dtype=np.float32)
+    ranges = build_layers(dem, landcover, rainfall, sar, rng.standard_normal((5, HEIGHT, WIDTH), dtype=np.float32))
+    dem_range, rainfall_range, sar_range = ranges[0:2], ranges[2:4], ranges[4:6]
 
-dem = dem.astype(np.float32)
+# 1. Generate DEM (Digital Elevation Model)
+logger.info("\n1. Creating DEM...")
+if not NUMBA_AVAILABLE:
+    # Create realistic elevation pattern (higher in north, lower in south)
+    # Row/column coordinate vectors broadcast against each other instead of
+    # full meshgrids, so per-axis terms are computed once per row or column
+    x = np.linspace(0, 1, WIDTH, dtype=np.float32)[None, :]
+    y = np.linspace(0, 1, HEIGHT, dtype=np.float32)[:, None]
+    
+    # Noise first, drawn straight into the float32 output
+    dem = rng.standard_normal((HEIGHT, WIDTH), dtype=np.float32)
+    dem *= 150  # Add noise
+    
+    # Base elevation with gradient
+    dem += 800 + 1200 * y  # 800m to 2000m elevation
+    
+    # Add some terrain features (separable: one sin per column, one cos per row)
+    dem += (200 * np.sin(x * 4 * np.pi)) * np.cos(y * 3 * np.pi)
+    
+    # Add a valley
+    valley_mask = ((x > 0.4) & (x < 0.6)) & ((y > 0.3) & (y < 0.7))
+    dem[valley_mask] -= 300
 
-with rasterio.open('../data/raw/dem.tif', 'w', **profile) as dst:
-    dst.write(dem, 1)
-print(f"   DEM created: range {dem.min():.0f}m to {dem.max():.0f}m")
+raster_writes.append(raster_writer.submit(write_tiled, '../data/raw/dem.tif', dem, profile))
+if logger.isEnabledFor(logging.INFO):
+    dem_min, dem_max = dem_range if NUMBA_AVAILABLE else (dem.min(), dem.max())
+    logger.info(f"   DEM created: range {dem_min:.0f}m to {dem_max:.0f}m")
 
 # 2. Generate Landcover
-print("\n2. Creating Landcover...")
-landcover = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
-
-# Different landcover types
-# 1=forest, 2=agriculture, 3=urban, 4=water, 5=barren
-landcover[:] = 1  # Default forest
-
-# Agriculture in valleys and lower elevations
-landcover[dem < 1200] = 2
-
-# Urban areas (concentrated in lower areas)
-urban_mask = (X > 0.35) & (X < 0.65) & (Y > 0.2) & (Y < 0.5) & (dem < 1000)
-landcover[urban_mask] = 3
-
-# Water bodies
-water_mask = (X > 0.45) & (X < 0.55) & (Y > 0.6) & (Y < 0.75) & (dem < 850)
-landcover[water_mask] = 4
-
-# Barren at high elevations
-landcover[dem > 1800] = 5
+logger.info("\n2. Creating Landcover...")
+if not NUMBA_AVAILABLE:
+    # Different landcover types
+    # 1=forest, 2=agriculture, 3=urban, 4=water, 5=barren
+    
+    # Urban areas (concentrated in lower areas)
+    urban_mask = ((x > 0.35) & (x < 0.65)) & ((y > 0.2) & (y < 0.5)) & (dem < 1000)
+    
+    # Water bodies
+    water_mask = ((x > 0.45) & (x < 0.55)) & ((y > 0.6) & (y < 0.75)) & (dem < 850)
+    
+    # One pass, first match wins: barren at high elevations, water, urban,
+    # agriculture in valleys and lower elevations, default forest
+    landcover = np.select(
+        [dem > 1800, water_mask, urban_mask, dem < 1200],
+        [np.uint8(5), np.uint8(4), np.uint8(3), np.uint8(2)],
+        default=np.uint8(1)
+    )
 
 profile_uint8 = profile.copy()
 profile_uint8['dtype'] = 'uint8'
 profile_uint8['nodata'] = 0  # Valid for uint8
-with rasterio.open('../data/raw/landcover.tif', 'w', **profile_uint8) as dst:
-    dst.write(landcover, 1)
-print(f"   Landcover created with {len(np.unique(landcover))} classes")
+profile_uint8['predictor'] = 1  # Differencing class codes only adds entropy
+raster_writes.append(raster_writer.submit(write_tiled, '../data/raw/landcover.tif', landcover, profile_uint8))
+if logger.isEnabledFor(logging.INFO):
+    n_classes = np.count_nonzero(np.bincount(landcover.ravel(), minlength=256))
+    logger.info(f"   Landcover created with {n_classes} classes")
 
 # 3. Generate Rainfall
-print("\n3. Creating Rainfall data...")
-# Higher rainfall in mountainous areas
-rainfall = 1500 + 500 * Y  # 1500-2000 mm/year
-rainfall += 200 * np.random.randn(HEIGHT, WIDTH)
-rainfall = np.maximum(rainfall, 1000)  # Minimum 1000mm
-rainfall = rainfall.astype(np.float32)
-
-with rasterio.open('../data/raw/rainfall.tif', 'w', **profile) as dst:
-    dst.write(rainfall, 1)
-print(f"   Rainfall created: {rainfall.min():.0f} to {rainfall.max():.0f} mm/year")
+logger.info("\n3. Creating Rainfall data...")
+if not NUMBA_AVAILABLE:
+    # Higher rainfall in mountainous areas
+    rainfall = rng.standard_normal((HEIGHT, WIDTH), dtype=np.float32)
+    rainfall *= 200
+    rainfall += 1500 + 500 * y  # 1500-2000 mm/year
+    np.maximum(rainfall, 1000, out=rainfall)  # Minimum 1000mm
+
+raster_writes.append(raster_writer.submit(write_tiled, '../data/raw/rainfall.tif', rainfall, profile))
+if logger.isEnabledFor(logging.INFO):
+    rainfall_min, rainfall_max = rainfall_range if NUMBA_AVAILABLE else (rainfall.min(), rainfall.max())
+    logger.info(f"   Rainfall created: {rainfall_min:.0f} to {rainfall_max:.0f} mm/year")
 
 # 4. Generate Sentinel-1 SAR (backscatter in dB)
-print("\n4. Creating Sentinel-1 SAR data...")
-# Water has low backscatter (<-18 dB)
-# Land has higher backscatter (-10 to -5 dB)
-sar = -8 + 3 * np.random.randn(HEIGHT, WIDTH)
-
-# Make water bodies have low backscatter
-sar[landcover == 4] = -22 + 2 * np.random.randn(np.sum(landcover == 4))
-
-# Simulate flood in low-lying areas
-flood_zone = (dem < 900) & (Y < 0.4)
-sar[flood_zone] = -20 + 3 * np.random.randn(np.sum(flood_zone))
-
-sar = sar.astype(np.float32)
+logger.info("\n4. Creating Sentinel-1 SAR data...")
+if not NUMBA_AVAILABLE:
+    # Water has low backscatter (<-18 dB)
+    # Land has higher backscatter (-10 to -5 dB)
+    sar = rng.standard_normal((HEIGHT, WIDTH), dtype=np.float32)
+    sar *= 3
+    sar -= 8
+    
+    # Make water bodies have low backscatter (mask scanned once into indices)
+    water = np.nonzero(landcover == 4)
+    sar[water] = rng.standard_normal(water[0].size, dtype=np.float32) * 2 - 22
+    
+    # Simulate flood in low-lying areas
+    flood_zone = np.nonzero((dem < 900) & (y < 0.4))
+    sar[flood_zone] = rng.standard_normal(flood_zone[0].size, dtype=np.float32) * 3 - 20
 
-with rasterio.open('../data/raw/sentinel1_sar.tif', 'w', **profile) as dst:
-    dst.write(sar, 1)
-print(f"   SAR created: {sar.min():.1f} to {sar.max():.1f} dB")
+raster_writes.append(raster_writer.submit(write_tiled, '../data/raw/sentinel1_sar.tif', sar, profile))
+if logger.isEnabledFor(logging.INFO):
+    sar_min, sar_max = sar_range if NUMBA_AVAILABLE else (sar.min(), sar.max())
+    logger.info(f"   SAR created: {sar_min:.1f} to {sar_max:.1f} dB")
 
 # 5. Generate Building Footprints
-print("\n5. Creating building footprints...")
-buildings = []
-
+logger.info("\n5. Creating building footprints...")
 # Generate buildings in urban areas
-np.random.seed(42)
 n_buildings = 200
 
-for i in range(n_buildings):
-    # Concentrate buildings in urban-friendly areas
-    lon = np.random.uniform(POKHARA_BOUNDS['west'] + 0.02, POKHARA_BOUNDS['east'] - 0.02)
-    lat = np.random.uniform(POKHARA_BOUNDS['south'] + 0.02, POKHARA_BOUNDS['north'] - 0.05)
-    
-    # Building size (small rectangles)
-    width = np.random.uniform(0.0002, 0.0008)
-    height = np.random.uniform(0.0002, 0.0008)
-    
-    # Create rectangle
-    coords = [
-        (lon, lat),
-        (lon + width, lat),
-        (lon + width, lat + height),
-        (lon, lat + height),
-        (lon, lat)
-    ]
-    
-    buildings.append({
-        'type': 'Feature',
-        'geometry': {
-            'type': 'Polygon',
-            'coordinates': [coords]
-        },
-        'properties': {
-            'id': i,
-            'type': 'residential' if i % 3 != 0 else 'commercial'
-        }
-    })
-
-buildings_geojson = {
-    'type': 'FeatureCollection',
-    'features': buildings
-}
-
-with open('../data/raw/buildings.geojson', 'w') as f:
-    json.dump(buildings_geojson, f)
-print(f"   Created {n_buildings} building footprints")
+# Concentrate buildings in urban-friendly areas; all corners drawn at once
+lons = rng.uniform(POKHARA_BOUNDS['west'] + 0.02, POKHARA_BOUNDS['east'] - 0.02, n_buildings)
+lats = rng.uniform(POKHARA_BOUNDS['south'] + 0.02, POKHARA_BOUNDS['north'] - 0.05, n_buildings)
+
+# Building size (small rectangles)
+widths = rng.uniform(0.0002, 0.0008, n_buildings)
+heights = rng.uniform(0.0002, 0.0008, n_buildings)
+
+building_ids = np.arange(n_buildings)
+buildings = gpd.GeoDataFrame(
+    {
+        'id': building_ids,
+        'type': np.where(building_ids % 3 != 0, 'residential', 'commercial')
+    },
+    geometry=shapely.box(lons, lats, lons + widths, lats + heights),
+    crs='EPSG:4326'
+)
+# Binary, columnar FlatGeobuf for the pipelines, plus the GeoJSON interchange copy
+pyogrio.write_dataframe(buildings, '../data/raw/buildings.fgb', driver='FlatGeobuf')
+pyogrio.write_dataframe(buildings, '../data/raw/buildings.geojson', driver='GeoJSON')
+logger.info(f"   Created {n_buildings} building footprints")
 
 # 6. Generate Landslide Inventory (training points)
-print("\n6. Creating landslide inventory...")
-landslide_points = []
-
+logger.info("\n6. Creating landslide inventory...")
 # Generate landslide points in susceptible areas:
 # - Steep slopes (high elevation gradients)
 # - High rainfall areas
 n_landslides = 50
 
-for i in range(n_landslides):
-    # Prefer northern (mountainous) areas
-    lon = np.random.uniform(POKHARA_BOUNDS['west'] + 0.01, POKHARA_BOUNDS['east'] - 0.01)
-    lat = np.random.uniform(POKHARA_BOUNDS['south'] + 0.08, POKHARA_BOUNDS['north'] - 0.01)
-    
-    landslide_points.append({
-        'type': 'Feature',
-        'geometry': {
-            'type': 'Point',
-            'coordinates': [lon, lat]
-        },
-        'properties': {
-            'id': i,
-            'date': '2024-01-01',
-            'type': 'debris_flow'
-        }
-    })
-
-landslide_geojson = {
-    'type': 'FeatureCollection',
-    'features': landslide_points
-}
-
-with open('../data/raw/landslide_inventory.geojson', 'w') as f:
-    json.dump(landslide_geojson, f)
-print(f"   Created {n_landslides} landslide inventory points")
-
-print("\n" + "="*60)
-print("Sample data generation complete!")
-print("="*60)
-print("\nGenerated files:")
-print("  ✓ data/raw/dem.tif")
-print("  ✓ data/raw/landcover.tif")
-print("  ✓ data/raw/rainfall.tif")
-print("  ✓ data/raw/sentinel1_sar.tif")
-print("  ✓ data/raw/buildings.geojson")
-print("  ✓ data/raw/landslide_inventory.geojson")
-print("\nReady to run hazard processing pipelines!")
+# Prefer northern (mountainous) areas
+lons = rng.uniform(POKHARA_BOUNDS['west'] + 0.01, POKHARA_BOUNDS['east'] - 0.01, n_landslides)
+lats = rng.uniform(POKHARA_BOUNDS['south'] + 0.08, POKHARA_BOUNDS['north'] - 0.01, n_landslides)
+
+landslides = gpd.GeoDataFrame(
+    {
+        'id': np.arange(n_landslides),
+        'date': '2024-01-01',
+        'type': 'debris_flow'
+    },
+    geometry=shapely.points(lons, lats),
+    crs='EPSG:4326'
+)
+landslides.to_file('../data/raw/landslide_inventory.geojson', driver='GeoJSON', engine='pyogrio')
+logger.info(f"   Created {n_landslides} landslide inventory points")
+
+# Wait for the raster writes, re-raising any write error
+for write in raster_writes:
+    write.result()
+raster_writer.shutdown()
+
+logger.info("\n" + "="*60)
+logger.info("Sample data generation complete!")
+logger.info("="*60)
+logger.info("\nGenerated files:")
+logger.info("  ✓ data/raw/dem.tif")
+logger.info("  ✓ data/raw/landcover.tif")
+logger.info("  ✓ data/raw/rainfall.tif")
+logger.info("  ✓ data/raw/sentinel1_sar.tif")
+logger.info("  ✓ data/raw/buildings.fgb (+ buildings.geojson)")
+logger.info("  ✓ data/raw/landslide_inventory.geojson")
+logger.info("\nReady to run hazard processing pipelines!")
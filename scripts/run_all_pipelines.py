@@ -1,82 +1,113 @@
 """
 Run all hazard processing pipelines to generate outputs
+
+Landslide and flood are independent and run in parallel worker processes;
+exposure and multi-hazard integration follow once their inputs exist.
 """
 
+import os
 import sys
 sys.path.append('..')
 
+# GDAL tuning, set before rasterio loads and inherited by the worker processes
+os.environ.setdefault('GDAL_CACHEMAX', '512')
+os.environ.setdefault('GDAL_NUM_THREADS', 'ALL_CPUS')
+os.environ.setdefault('GDAL_DISABLE_READDIR_ON_OPEN', 'EMPTY_DIR')
+
+from concurrent.futures import ProcessPoolExecutor
+import traceback
+
 from backend.processing.landslide.pipeline import run_landslide_pipeline
 from backend.processing.flood.pipeline import run_flood_pipeline
 from backend.processing.exposure.pipeline import run_exposure_pipeline
 from backend.processing.multi_hazard import run_multi_hazard_integration
+from backend.config import OUTPUTS_DIR
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-print("="*70)
-print(" POKHARA MULTI-HAZARD PROCESSING PIPELINE")
-print("="*70)
-
-# 1. Run Landslide Susceptibility Analysis
-print("\n\n🏔️  STEP 1: LANDSLIDE SUSCEPTIBILITY ANALYSIS")
-print("-"*70)
-try:
-    landslide_outputs = run_landslide_pipeline(train_new_model=True)
-    print(f"\n✅ Landslide analysis complete!")
-    print(f"   Outputs: {len(landslide_outputs)} files generated")
-except Exception as e:
-    print(f"\n❌ Landslide analysis failed: {e}")
-    import traceback
-    traceback.print_exc()
 
-# 2. Run Flood Mapping
-print("\n\n🌊 STEP 2: FLOOD MAPPING")
-print("-"*70)
-try:
-    flood_outputs = run_flood_pipeline()
-    print(f"\n✅ Flood mapping complete!")
-    print(f"   Outputs: {len(flood_outputs)} files generated")
-except Exception as e:
-    print(f"\n❌ Flood mapping failed: {e}")
-    import traceback
-    traceback.print_exc()
-
-# 3. Run Exposure Analysis (using landslide output)
-print("\n\n🏘️  STEP 3: EXPOSURE ANALYSIS")
-print("-"*70)
-try:
-    from pathlib import Path
-    from backend.config import OUTPUTS_DIR
+def report(future, name):
+    """
+    Print the outcome of a pipeline future
+    
+    Args:
+        future: Future returned by ProcessPoolExecutor.submit
+        name: Human readable pipeline name
     
-    hazard_raster = OUTPUTS_DIR / "landslide_susceptibility_probability.tif"
-    exposure_outputs = run_exposure_pipeline(hazard_raster_path=hazard_raster)
-    print(f"\n✅ Exposure analysis complete!")
-    print(f"   Outputs: {len(exposure_outputs)} files generated")
-except Exception as e:
-    print(f"\n❌  Exposure analysis failed: {e}")
-    import traceback
-    traceback.print_exc()
+    Returns:
+        Pipeline outputs, or None if the pipeline failed
+    """
+    try:
+        outputs = future.result()
+        print(f"\n✅ {name} complete!")
+        print(f"   Outputs: {len(outputs)} files generated")
+        return outputs
+    except Exception as e:
+        print(f"\n❌ {name} failed: {e}")
+        traceback.print_exc()
+        return None
 
-# 4. Run Multi-Hazard Integration
-print("\n\n⚠️  STEP 4: MULTI-HAZARD RISK INTEGRATION")
-print("-"*70)
-try:
-    multi_hazard_outputs = run_multi_hazard_integration()
-    print(f"\n✅ Multi-hazard integration complete!")
-    print(f"   Outputs: {len(multi_hazard_outputs)} files generated")
-except Exception as e:
-    print(f"\n❌ Multi-hazard integration failed: {e}")
-    import traceback
-    traceback.print_exc()
 
-print("\n\n" + "="*70)
-print(" 🎉 ALL PIPELINES COMPLETE!")
-print("="*70)
-print("\nGenerated outputs in data/outputs/:")
-print("  📊 Landslide susceptibility maps (GeoTIFF + GeoJSON)")
-print("  📊 Flood extent maps (GeoTIFF + GeoJSON)")
-print("  📊 Exposure analysis (GeoTIFF + GeoJSON)")
-print("  📊 Multi-hazard risk map (GeoTIFF + GeoJSON)")
-print("\n🌐 View results at: http://localhost:8000")
-print("   Toggle layers in the sidebar to visualize hazards!")
+if __name__ == '__main__':
+    # Configure logging
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    print("="*70)
+    print(" POKHARA MULTI-HAZARD PROCESSING PIPELINE")
+    print("="*70)
+    
+    # Worker processes sidestep the GIL for the numpy/rasterio-heavy pipelines
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        # 1-2. Landslide susceptibility and flood mapping are independent
+        print("\n\n🏔️  STEP 1: LANDSLIDE SUSCEPTIBILITY ANALYSIS")
+        print("🌊 STEP 2: FLOOD MAPPING")
+        print("-"*70)
+        landslide_future = executor.submit(run_landslide_pipeline, train_new_model=True)
+        flood_future = executor.submit(run_flood_pipeline)
+        
+        # Steps whose outputs are missing; dependent steps are skipped
+        failed = set()
+        
+        landslide_outputs = report(landslide_future, "Landslide analysis")
+        if landslide_outputs is None:
+            failed.add("landslide")
+        flood_outputs = report(flood_future, "Flood mapping")
+        if flood_outputs is None:
+            failed.add("flood")
+        
+        # 3. Run Exposure Analysis (using landslide output)
+        print("\n\n🏘️  STEP 3: EXPOSURE ANALYSIS")
+        print("-"*70)
+        if "landslide" in failed:
+            print("\n⏭️  Exposure analysis skipped: landslide analysis failed")
+            failed.add("exposure")
+        else:
+            hazard_raster = OUTPUTS_DIR / "landslide_susceptibility_probability.tif"
+            exposure_future = executor.submit(run_exposure_pipeline, hazard_raster_path=hazard_raster)
+            if report(exposure_future, "Exposure analysis") is None:
+                failed.add("exposure")
+        
+        # 4. Run Multi-Hazard Integration (exposure is an optional input)
+        print("\n\n⚠️  STEP 4: MULTI-HAZARD RISK INTEGRATION")
+        print("-"*70)
+        missing = failed & {"landslide", "flood"}
+        if missing:
+            print(f"\n⏭️  Multi-hazard integration skipped: {', '.join(sorted(missing))} failed")
+            failed.add("multi_hazard")
+        else:
+            multi_hazard_future = executor.submit(run_multi_hazard_integration)
+            if report(multi_hazard_future, "Multi-hazard integration") is None:
+                failed.add("multi_hazard")
+    
+    print("\n\n" + "="*70)
+    if failed:
+        print(f" ⚠️  PIPELINES FINISHED WITH FAILURES: {', '.join(sorted(failed))}")
+    else:
+        print(" 🎉 ALL PIPELINES COMPLETE!")
+    print("="*70)
+    print("\nGenerated outputs in data/outputs/:")
+    print("  📊 Landslide susceptibility maps (GeoTIFF + GeoJSON)")
+    print("  📊 Flood extent maps (GeoTIFF + GeoJSON)")
+    print("  📊 Exposure analysis (GeoTIFF + GeoJSON)")
+    print("  📊 Multi-hazard risk map (GeoTIFF + GeoJSON)")
+    print("\n🌐 View results at: http://localhost:8000")
+    print("   Toggle layers in the sidebar to visualize hazards!")
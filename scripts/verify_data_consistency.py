@@ -3,14 +3,38 @@ Verify that raster and GeoJSON contain identical data
 """
 
 import rasterio
-import json
 import numpy as np
 from pathlib import Path
+from collections import Counter
+import logging
+
+try:
+    import ijson
+    try:
+        # C parser (yajl2) when it was built, else the default backend
+        ijson = ijson.get_backend('yajl2_c')
+    except ImportError:
+        pass
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import pyogrio
+    PYOGRIO_AVAILABLE = True
+except ImportError:
+    import fiona
+    PYOGRIO_AVAILABLE = False
+    logging.warning("pyogrio not available, reading GeoJSON attributes with fiona")
 
 # Paths
 raster_path = Path("../data/outputs/landslide_susceptibility_classified.tif")
 geojson_path = Path("../data/outputs/landslide_susceptibility_zones.geojson")
 
+# Read the FlatGeobuf copy written next to the GeoJSON when present (same reader, binary format)
+if geojson_path.with_suffix('.fgb').exists():
+    geojson_path = geojson_path.with_suffix('.fgb')
+
 print("="*70)
 print("VERIFICATION: Raster vs GeoJSON Data Consistency")
 print("="*70)
@@ -20,12 +44,18 @@ print("\n1. RASTER Analysis:")
 print(f"   File: {raster_path.name}")
 
 with rasterio.open(raster_path) as src:
-    raster_data = src.read(1)
-    print(f"   Shape: {raster_data.shape}")
-    print(f"   Data type: {raster_data.dtype}")
+    print(f"   Shape: {src.shape}")
+    print(f"   Data type: {src.dtypes[0]}")
+    n_pixels = src.width * src.height
     
-    # Count pixels per class
-    unique_values, counts = np.unique(raster_data, return_counts=True)
+    # Count pixels per class, one block at a time (O(N) histogram, bounded memory)
+    histogram = np.zeros(256, dtype=np.int64)
+    for _, window in src.block_windows(1):
+        block = src.read(1, window=window, out_dtype='uint8')
+        histogram += np.bincount(block.ravel(), minlength=256)
+    
+    unique_values = np.nonzero(histogram)[0]
+    counts = histogram[unique_values]
     print(f"\n   Pixel counts per class:")
     class_names = {0: "nodata", 1: "very_low", 2: "low", 3: "moderate", 4: "high", 5: "very_high"}
     
@@ -39,25 +69,40 @@ with rasterio.open(raster_path) as src:
 print(f"\n2. GEOJSON Analysis:")
 print(f"   File: {geojson_path.name}")
 
-with open(geojson_path, 'r') as f:
-    geojson = json.load(f)
-    features = geojson['features']
-    print(f"   Total features (polygons): {len(features):,}")
-    
-    # Count features per class
-    geojson_class_counts = {}
-    for feature in features:
-        value = feature['properties']['value']
-        class_name = feature['properties']['class']
-        
-        if value not in geojson_class_counts:
-            geojson_class_counts[value] = {'count': 0, 'name': class_name}
-        geojson_class_counts[value]['count'] += 1
-    
-    print(f"\n   Feature counts per class:")
-    for val in sorted(geojson_class_counts.keys()):
-        info = geojson_class_counts[val]
-        print(f"     Class {val} ({info['name']:12s}): {info['count']:,} polygons")
+# Attribute columns only, geometries are never materialized
+if IJSON_AVAILABLE and geojson_path.suffix == '.geojson':
+    # Stream feature properties; the document is never held in memory
+    with open(geojson_path, 'rb') as f:
+        pair_counts = Counter(
+            (props['value'], props['class']) for props in ijson.items(f, 'features.item.properties')
+        )
+    n_features = sum(pair_counts.values())
+    pairs = ((value, name, count) for (value, name), count in pair_counts.items())
+elif PYOGRIO_AVAILABLE:
+    attributes = pyogrio.read_dataframe(geojson_path, read_geometry=False, columns=['value', 'class'])
+    n_features = len(attributes)
+    counts = attributes.groupby(['value', 'class']).size().reset_index(name='count')
+    pairs = zip(counts['value'], counts['class'], counts['count'])
+else:
+    with fiona.open(geojson_path) as src:
+        pair_counts = Counter((f['properties']['value'], f['properties']['class']) for f in src)
+    n_features = sum(pair_counts.values())
+    pairs = ((value, name, count) for (value, name), count in pair_counts.items())
+
+print(f"   Total features (polygons): {n_features:,}")
+
+# Count features per class
+geojson_class_counts = {}
+for value, class_name, count in pairs:
+    value = int(value)
+    if value not in geojson_class_counts:
+        geojson_class_counts[value] = {'count': 0, 'name': class_name}
+    geojson_class_counts[value]['count'] += int(count)
+
+print(f"\n   Feature counts per class:")
+for val in sorted(geojson_class_counts.keys()):
+    info = geojson_class_counts[val]
+    print(f"     Class {val} ({info['name']:12s}): {info['count']:,} polygons")
 
 # 3. VERIFICATION
 print("\n" + "="*70)
@@ -87,9 +132,9 @@ for val in sorted(geojson_class_counts.keys()):
     print(f"     {val} → '{geojson_class_counts[val]['name']}'")
 
 print("\n✓ Data Representation:")
-print(f"  - Raster: {raster_data.size:,} total pixels")
-print(f"  - GeoJSON: {len(features):,} polygons (grouped pixels)")
-print(f"  - Ratio: ~{raster_data.size / len(features):.0f} pixels per polygon (average)")
+print(f"  - Raster: {n_pixels:,} total pixels")
+print(f"  - GeoJSON: {n_features:,} polygons (grouped pixels)")
+print(f"  - Ratio: ~{n_pixels / n_features:.0f} pixels per polygon (average)")
 
 print("\n" + "="*70)
 print("CONCLUSION:")